@@ -3,44 +3,53 @@ agent_orchestrator.py
 Runs and saves the results of the EDD assessment and KYC quality checks.
 """
 
+import functools
 import logging
 import os
-from glob import glob
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from constants import OUTPUT_FOLDER, OU_CODE_DATA_PATH
 from output_writer import output_writer
 from edd_agent.edd_text_parser import edd_text_parser
 from edd_agent.edd_assessment_agent_output import edd_assessment_agent_output
-from kyc_agent.kyc_assessment_agent_output import kyc_assessment_agent_output
-from kyc_agent.process_kyc_pdf import process_kyc_pdf
-from kyc_agent.utils import resolve_ou_mapping, serialise_kyc_dataset
-from kyc_agent.pipeline import (
-    KYC_CHECK_KEYS,
-    OUT_OF_SCOPE_CHECKS,
-)
+from kyc_agent.kyc_assessment_agent_output import get_kyc_agent
+from kyc_agent.pdf_cache import cached_process_kyc_pdf
+from kyc_agent.utils import read_edd_text, resolve_ou_mapping, serialise_kyc_dataset
+from kyc_agent.checks_config import init_kyc_checks_output
 from utils.fuzzy_match import match_and_save_partners
 from utils.func_utils import save_json
 from utils.logger_config import setup_logger
 
 logger = setup_logger(__name__)
 
-DICT_KYC_CHECKS_NAME_DISPLAY = {
-    "sign_off": "1. Sign-Off",
-    "additional_sign_offs": "2. Additional Sign-Offs",
-    "purpose_of_business_relationships": "3. Purpose of Business Relationship",
-    "origin_of_asset": "4. Origin of Assets",
-    "corroboration": "5. Corroboration and Evidence",
-    "percentage_total_assets_explained": "6. Total Assets / Composition of Assets",
-    "remarks_on_total_assets_and_composition": "7. Remarks on Total Assets and Asset Composition",
-    "activity": "8. Activity",
-    "transactions": "9. Transactions",
-    "family_situation": "10. Family Situation",
-    "consistency_checks_within_kyc": "11.1 Consistency Checks within the KYC - role holders and ASM numbers",
-    "consistency_checks_within_kyc_contradiction_checks": "11.2 Consistency Checks within the KYC - contradiction checks: one field vs other fields",
-    "consistency_checks_with_previous_edd": "12. Consistency Checks with Previous EDD Assessment",
-    "scap_flags": "13. SCAP Flags",
-    "siap_flags": "14. SIAP Flags",
-}
+
+@functools.lru_cache(maxsize=1)
+def _get_edd_agent():
+    """Return the compiled EDD agent, built once per process and shared across cases."""
+    return edd_assessment_agent_output().agent
+
+
+def _list_dir(path: str, name_filter=None) -> list:
+    """Return the sorted paths of non-hidden entries of *path* in one scandir pass."""
+    try:
+        with os.scandir(path) as entries:
+            return sorted(
+                entry.path
+                for entry in entries
+                if not entry.name.startswith(".")
+                and (name_filter is None or name_filter(entry.name))
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _has_entries(path: str) -> bool:
+    """True if *path* is a directory with at least one non-hidden entry."""
+    try:
+        with os.scandir(path) as entries:
+            return any(not entry.name.startswith(".") for entry in entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
 
 
 class agent_orchestrator:
@@ -57,7 +66,9 @@ class agent_orchestrator:
 
         # --- Locate DD text file ---
         try:
-            self.edd_case_path = glob(edd_case_path + "/DD-*.txt")[0]
+            self.edd_case_path = _list_dir(
+                edd_case_path, lambda name: name.startswith("DD-") and name.endswith(".txt")
+            )[0]
             logger.info(f"EDD case path: {self.edd_case_path}")
         except IndexError:
             logger.error(f"No DD-*.txt file found in {edd_case_path}")
@@ -66,9 +77,9 @@ class agent_orchestrator:
         self.case_number = edd_case_path.split("/")[-1]
         logger.info(f"Case number: {self.case_number}")
 
-        self.partner_folders = glob(edd_case_path + "/Partners/*")
-        self.pep_documents_present = (
-            len(glob(edd_case_path + "/Sensitivity Attachments/PEP/*")) > 0
+        self.partner_folders = _list_dir(os.path.join(edd_case_path, "Partners"))
+        self.pep_documents_present = _has_entries(
+            os.path.join(edd_case_path, "Sensitivity Attachments", "PEP")
         )
 
         if not self.partner_folders:
@@ -77,32 +88,23 @@ class agent_orchestrator:
             logger.info(f"Found {len(self.partner_folders)} partner folders")
 
         # --- Parse EDD text ---
-        with open(self.edd_case_path, "r", encoding="ISO-8859-1") as f:
-            self.edd_raw_text = f.read()
-            self.edd_case = edd_text_parser.edd_info_parsing(self.edd_raw_text)
+        self.edd_raw_text = read_edd_text(self.edd_case_path)
+        self.edd_case = edd_text_parser.edd_info_parsing(self.edd_raw_text)
 
-        # --- Process KYC PDFs ---
-        self.kyc_cases = [
-            process_kyc_pdf(partner_folder)
-            for partner_folder in self.partner_folders
-        ]
+        # --- Process KYC PDFs (cached by content hash, one folder per worker) ---
+        if self.partner_folders:
+            with ThreadPoolExecutor(max_workers=min(8, len(self.partner_folders))) as executor:
+                self.kyc_cases = list(executor.map(cached_process_kyc_pdf, self.partner_folders))
+        else:
+            self.kyc_cases = []
 
         logger.info("Starting analysis pipeline")
         self.run_analysis()
         self.write_results()
 
     def _init_kyc_checks_output(self) -> dict:
-        """Initialise the kyc_checks_output dict with status, reason and display_name."""
-        kyc_checks_output = {}
-        for check_name, display_name in DICT_KYC_CHECKS_NAME_DISPLAY.items():
-            kyc_checks_output[check_name] = {
-                "status": True,
-                "reason": "",
-                "display_name": display_name,
-            }
-            if check_name in OUT_OF_SCOPE_CHECKS:
-                kyc_checks_output[check_name]["reason"] = "Out of scope currently."
-        return kyc_checks_output
+        """Return a fresh kyc_checks_output dict with status, reason and display_name."""
+        return init_kyc_checks_output()
 
     def run_analysis(self):
         """Run the EDD assessment and KYC quality checks."""
@@ -117,104 +119,149 @@ class agent_orchestrator:
             "raw_text": self.edd_raw_text,
             "dict_parsed_text": self.edd_case,
         }
-        edd_agent = edd_assessment_agent_output().agent
-        self.edd_result = edd_agent.invoke(initial_edd_state)
+        edd_agent = _get_edd_agent()
+
+        # The KYC checks only need the pre-parsed self.edd_case, so run the EDD
+        # agent in the background and collect its result once KYC is done.
+        edd_executor = ThreadPoolExecutor(max_workers=1)
+        edd_future = edd_executor.submit(edd_agent.invoke, initial_edd_state)
+
+        # Shut the EDD executor down on every path, including a failing KYC section
+        try:
+            # The raw DD text is only needed by the EDD agent — drop our references
+            del initial_edd_state
+            del self.edd_raw_text
+
+            # --- KYC analysis ---
+            logger.info("Starting KYC checks output processing")
+
+            # Extract partner names from EDD case
+            edd_partner_names = [
+                partner["name"]
+                for partner in self.edd_case.get("total_wealth_composition", [])
+            ]
+            edd_name = self.edd_case["contractual_partner_information"]["name"]
+            ou_code_mapped = resolve_ou_mapping(self.edd_case, ou_code_data_path=OU_CODE_DATA_PATH)
+
+            # Fuzzy match KYC partners to EDD partners
+            self.partner_mappings = match_and_save_partners(
+                self.kyc_cases,
+                edd_partner_names,
+                threshold=0.8,
+                output_path=os.path.join(
+                    OUTPUT_FOLDER, self.case_number, "partner_name_mapping.json"
+                ),
+                verbose=True,
+            )
+
+            # Filter out KYC cases with empty datasets
+            client_histories_parsed = [
+                item for item in self.kyc_cases if item.kyc_dataset is not None
+            ]
+            logger.info(f"Valid KYC histories: {len(client_histories_parsed)}")
+
+            # Index mappings and parsed cases once so each partner lookup is O(1).
+            # setdefault keeps the first match, as the previous linear scans did.
+            edd_to_kyc = {}
+            for r in self.partner_mappings["mappings"]:
+                edd_to_kyc.setdefault(r["matched_edd_name"], r["kyc_partner_name"])
+            kyc_to_info = {}
+            for info in client_histories_parsed:
+                kyc_to_info.setdefault(info.partner_name, info)
+
+            # KYC LangGraph agent (compiled once per process, shared across partners)
+            kyc_agent = get_kyc_agent()
+
+            # Run KYC checks for each EDD partner. Partners are independent and the
+            # checks are dominated by blocking LLM calls, so run them on a thread pool.
+            partner_results = {}
+            if edd_partner_names:
+                with ThreadPoolExecutor(max_workers=min(8, len(edd_partner_names))) as executor:
+                    futures = [
+                        executor.submit(
+                            self._run_one_partner,
+                            partner_name_edd,
+                            kyc_agent,
+                            edd_to_kyc,
+                            kyc_to_info,
+                            ou_code_mapped,
+                        )
+                        for partner_name_edd in edd_partner_names
+                    ]
+                    for future in as_completed(futures):
+                        partner_name_edd, final_kyc_state = future.result()
+                        if final_kyc_state is not None:
+                            partner_results[partner_name_edd] = final_kyc_state["kyc_checks_output"]
+
+            # Keep the EDD partner order for the report, regardless of completion order
+            self.kyc_results = {
+                name: partner_results[name]
+                for name in edd_partner_names
+                if name in partner_results
+            }
 
+            # --- EDD result ---
+            self.edd_result = edd_future.result()
+        finally:
+            edd_executor.shutdown(wait=False, cancel_futures=True)
         save_json(self.edd_result, OUTPUT_FOLDER, self.case_number, "edd_assessment_agent_output.json")
         logger.info("Intermediate data saved for edd result")
 
-        # --- KYC analysis ---
-        logger.info("Starting KYC checks output processing")
-
-        # Extract partner names from EDD case
-        edd_partner_names = [
-            partner["name"]
-            for partner in self.edd_case.get("total_wealth_composition", [])
-        ]
-        edd_name = self.edd_case["contractual_partner_information"]["name"]
-        ou_code_mapped = resolve_ou_mapping(self.edd_case, ou_code_data_path=OU_CODE_DATA_PATH)
-
-        # Fuzzy match KYC partners to EDD partners
-        self.partner_mappings = match_and_save_partners(
-            self.kyc_cases,
-            edd_partner_names,
-            threshold=0.8,
-            output_path=os.path.join(
-                OUTPUT_FOLDER, self.case_number, "partner_name_mapping.json"
-            ),
-            verbose=True,
-        )
+        logger.info("run analysis completed successfully")
 
-        # Filter out KYC cases with empty datasets
-        client_histories_parsed = [
-            item for item in self.kyc_cases if item.kyc_dataset is not None
-        ]
-        logger.info(f"Valid KYC histories: {len(client_histories_parsed)}")
-
-        # Initialise shared output structure
-        kyc_checks_output = self._init_kyc_checks_output()
-
-        # Build the KYC LangGraph agent (once, shared across all partners)
-        kyc_agent = kyc_assessment_agent_output().agent
-
-        # Run KYC checks for each EDD partner
-        self.kyc_results = {}
-        for partner_name_edd in edd_partner_names:
-            logger.info(f"Running KYC checks for partner: {partner_name_edd}")
-
-            # Find the matching KYC partner_info
-            kyc_folder = next(
-                (
-                    r["kyc_partner_name"]
-                    for r in self.partner_mappings["mappings"]
-                    if r["matched_edd_name"] == partner_name_edd
-                ),
-                None,
-            )
-            partner_info = next(
-                (
-                    info
-                    for info in client_histories_parsed
-                    if info.partner_name == kyc_folder
-                ),
-                None,
-            )
+    def _run_one_partner(
+        self,
+        partner_name_edd: str,
+        kyc_agent,
+        edd_to_kyc: dict,
+        kyc_to_info: dict,
+        ou_code_mapped: str,
+    ) -> tuple:
+        """Run the KYC checks for one EDD partner.
+
+        Returns (partner_name_edd, final_kyc_state); the state is None when the
+        partner could not be resolved to a parsed KYC case.
+        """
+        logger.info(f"Running KYC checks for partner: {partner_name_edd}")
 
-            if not kyc_folder or not partner_info:
-                logger.warning(f"Could not resolve partner info for: {partner_name_edd}")
-                continue
+        # Find the matching KYC partner_info
+        kyc_folder = edd_to_kyc.get(partner_name_edd)
+        partner_info = kyc_to_info.get(kyc_folder)
 
-            folder_name = os.path.join(
-                self.case_number,
-                os.path.basename(partner_info.kyc_folder_path),
-            )
+        if not kyc_folder or not partner_info:
+            logger.warning(f"Could not resolve partner info for: {partner_name_edd}")
+            return partner_name_edd, None
 
-            # Serialise KYC dataset to disk
-            serialise_kyc_dataset(partner_info, OUTPUT_FOLDER, folder_name)
-
-            # Build initial KYC state
-            initial_kyc_state = {
-                "partner_name": partner_info.partner_name,
-                "folder_name": folder_name,
-                "ou_code_mapped": ou_code_mapped,
-                "output_folder": OUTPUT_FOLDER,
-                "partner_info": partner_info,
-                "kyc_checks_output": kyc_checks_output,
-            }
+        folder_name = os.path.join(
+            self.case_number,
+            os.path.basename(partner_info.kyc_folder_path),
+        )
 
-            # Run the LangGraph KYC pipeline
-            final_kyc_state = kyc_agent.invoke(initial_kyc_state)
-            self.kyc_results[partner_name_edd] = final_kyc_state["kyc_checks_output"]
+        # Serialise KYC dataset to disk
+        serialise_kyc_dataset(partner_info, OUTPUT_FOLDER, folder_name)
+
+        # Build initial KYC state — each partner gets its own output structure
+        # so concurrent runs never mutate the same dict.
+        initial_kyc_state = {
+            "partner_name": partner_info.partner_name,
+            "folder_name": folder_name,
+            "ou_code_mapped": ou_code_mapped,
+            "output_folder": OUTPUT_FOLDER,
+            "partner_info": partner_info,
+            "kyc_checks_output": self._init_kyc_checks_output(),
+        }
 
-            save_json(
-                self.kyc_results[partner_name_edd],
-                OUTPUT_FOLDER,
-                folder_name,
-                "kyc_checks_output.json",
-            )
-            logger.info(f"KYC checks completed for: {partner_name_edd}")
+        # Run the LangGraph KYC pipeline
+        final_kyc_state = kyc_agent.invoke(initial_kyc_state)
 
-        logger.info("run analysis completed successfully")
+        save_json(
+            final_kyc_state["kyc_checks_output"],
+            OUTPUT_FOLDER,
+            folder_name,
+            "kyc_checks_output.json",
+        )
+        logger.info(f"KYC checks completed for: {partner_name_edd}")
+        return partner_name_edd, final_kyc_state
 
     def write_results(self):
         """Write the results into a formatted Word report."""
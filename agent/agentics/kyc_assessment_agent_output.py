@@ -3,16 +3,19 @@ kyc_assessment_agent_output.py
 LangGraph pipeline for KYC quality checks.
 Mirrors the pattern of edd_assessment_agent_output.py.
 
-Each node corresponds to one KYC section check. Nodes read from and write
-back to the shared kyc_state, progressively enriching it.
+Sections 3 and 4 are answered together by one node that issues a single
+combined LLM call. Further section nodes fan out from START and run in
+parallel; their partial updates to kyc_checks_output are merged by the
+reducer declared in kyc_state.
 """
 
-from langgraph.graph import StateGraph, END
+import functools
+
+from langgraph.graph import StateGraph, START, END
 
 from kyc_agent.kyc_state import kyc_state
 from kyc_agent.kyc_checks_nodes import (
-    node_section3_purpose_of_br,
-    node_section4_origin_of_assets,
+    node_combined_kyc_checks,
     # node_section6_total_assets,   # add as sections are implemented
 )
 from kyc_agent.utils import build_llm
@@ -29,24 +32,26 @@ class kyc_assessment_agent_output:
         # --- Add nodes ---
         # LLM-powered checks use lambda to inject the llm dependency,
         # matching the same pattern as edd_assessment_agent_output.
+        # Sections 3 and 4 share one LLM round-trip (see checks.run_combined).
         self.graph.add_node(
-            "section3_purpose_of_br",
-            lambda s: node_section3_purpose_of_br(s, self.llm),
-        )
-        self.graph.add_node(
-            "section4_origin_of_assets",
-            lambda s: node_section4_origin_of_assets(s, self.llm),
+            "section3_4_combined",
+            lambda s: node_combined_kyc_checks(s, self.llm),
         )
         # self.graph.add_node(
         #     "section6_total_assets",
         #     lambda s: node_section6_total_assets(s, self.llm),
         # )
 
-        # --- Define execution order ---
-        self.graph.set_entry_point("section3_purpose_of_br")
-        self.graph.add_edge("section3_purpose_of_br", "section4_origin_of_assets")
-        self.graph.add_edge("section4_origin_of_assets", END)
-        # self.graph.add_edge("section4_origin_of_assets", "section6_total_assets")
+        # --- Define execution order (independent sections run in parallel) ---
+        self.graph.add_edge(START, "section3_4_combined")
+        self.graph.add_edge("section3_4_combined", END)
+        # self.graph.add_edge(START, "section6_total_assets")
         # self.graph.add_edge("section6_total_assets", END)
 
         self.agent = self.graph.compile()
+
+
+@functools.lru_cache(maxsize=1)
+def get_kyc_agent():
+    """Return the compiled KYC agent, built once per process and shared across cases."""
+    return kyc_assessment_agent_output().agent
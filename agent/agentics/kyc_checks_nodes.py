@@ -2,60 +2,59 @@
 kyc_checks_nodes.py
 LangGraph node wrappers for each KYC section check.
 
-Each function takes the shared kyc_state, calls the underlying check logic,
-updates kyc_checks_output, and returns the updated state — exactly the same
-pattern as nodes in edd_assessment_agent_output.py.
+Each function takes the shared kyc_state, calls the underlying check logic on
+its own section of kyc_checks_output, and returns only that section. Nodes run
+in parallel, so the kyc_checks_output reducer in kyc_state merges the partial
+updates instead of each node overwriting the whole dict.
 """
 
 from kyc_agent.kyc_state import kyc_state
-from kyc_agent.checks import run_section3, run_section4
+from kyc_agent.checks import run_combined
 
 
-def node_section3_purpose_of_br(state: kyc_state, llm) -> kyc_state:
-    """LangGraph node: Section 3 — Purpose of Business Relationship."""
-    run_section3(
-        partner_info=state["partner_info"],
-        partner_name=state["partner_name"],
-        folder_name=state["folder_name"],
-        ou_code_mapped=state["ou_code_mapped"],
-        kyc_checks_output=state["kyc_checks_output"],
-        output_folder=state["output_folder"],
-        llm=llm,
-    )
-    return {
-        **state,
-        "purpose_of_business_relationships": state["kyc_checks_output"]["purpose_of_business_relationships"],
-    }
+def _section_output(state: kyc_state, check_name: str) -> dict:
+    """Copy a single section of kyc_checks_output for a node to update."""
+    return {check_name: dict(state["kyc_checks_output"][check_name])}
 
 
-def node_section4_origin_of_assets(state: kyc_state, llm) -> kyc_state:
-    """LangGraph node: Section 4 — Origin of Assets."""
-    run_section4(
+def node_combined_kyc_checks(state: kyc_state, llm) -> kyc_state:
+    """LangGraph node: Sections 3 and 4 answered by a single LLM call."""
+    section_output = {
+        **_section_output(state, "purpose_of_business_relationships"),
+        **_section_output(state, "origin_of_asset"),
+    }
+    run_combined(
         partner_info=state["partner_info"],
         partner_name=state["partner_name"],
         folder_name=state["folder_name"],
-        kyc_checks_output=state["kyc_checks_output"],
+        ou_code_mapped=state["ou_code_mapped"],
+        kyc_checks_output=section_output,
         output_folder=state["output_folder"],
         llm=llm,
     )
     return {
-        **state,
-        "origin_of_asset": state["kyc_checks_output"]["origin_of_asset"],
+        "kyc_checks_output": section_output,
+        "purpose_of_business_relationships": section_output["purpose_of_business_relationships"],
+        "origin_of_asset": section_output["origin_of_asset"],
     }
 
 
+# Sections 3 and 4 fall back to run_section3 / run_section4 inside run_combined
+# when either is out of scope, so they need no nodes of their own.
+
 # --- Template for adding new sections ---
 # def node_section6_total_assets(state: kyc_state, llm) -> kyc_state:
 #     """LangGraph node: Section 6 — Total Assets."""
+#     section_output = _section_output(state, "total_assets")
 #     run_section6(
 #         partner_info=state["partner_info"],
 #         partner_name=state["partner_name"],
 #         folder_name=state["folder_name"],
-#         kyc_checks_output=state["kyc_checks_output"],
+#         kyc_checks_output=section_output,
 #         output_folder=state["output_folder"],
 #         llm=llm,
 #     )
 #     return {
-#         **state,
-#         "total_assets": state["kyc_checks_output"]["total_assets"],
+#         "kyc_checks_output": section_output,
+#         "total_assets": section_output["total_assets"],
 #     }
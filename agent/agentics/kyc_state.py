@@ -4,7 +4,12 @@ Shared state object passed through the KYC checks LangGraph pipeline.
 Mirrors the pattern of edd_state.py.
 """
 
-from typing import TypedDict, Dict, Any
+from typing import Annotated, TypedDict, Dict, Any
+
+
+def merge_dicts(left: Dict, right: Dict) -> Dict:
+    """Reducer: merge section results written by parallel nodes."""
+    return {**(left or {}), **(right or {})}
 
 
 class kyc_state(TypedDict, total=False):
@@ -14,7 +19,7 @@ class kyc_state(TypedDict, total=False):
     ou_code_mapped: str
     output_folder: str
     partner_info: Any               # parsed KYC partner object
-    kyc_checks_output: Dict         # accumulated results, updated by each node
+    kyc_checks_output: Annotated[Dict, merge_dicts]  # accumulated results, merged across nodes
 
     # --- Section outputs (populated progressively by each node) ---
     purpose_of_business_relationships: Dict     # Section 3
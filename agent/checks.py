@@ -4,14 +4,23 @@ All KYC section check functions.
 Each run_sectionN() function runs its checks and updates kyc_checks_output in-place.
 """
 
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llama_index.llms import ChatMessage, MessageRole
 from llama_index.program import LLMTextCompletionProgram
+from llama_index.prompts import ChatPromptTemplate
 
 from kyc_agent.models import (
     PurposeOfBusinessRelationship,
     CheckTransactionSummary,
     CompletenessOriginOfAssets,
+    CombinedKycAssessment,
 )
-from kyc_agent.utils import save_json
+from kyc_agent.utils import save_json, to_prompt_text
+from kyc_agent.checks_config import OUT_OF_SCOPE_CHECKS
+from kyc_agent.llm_cache import cached_llm_call
 from kyc_agent.prompts import (
     COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT,
     SUMMARIZE_TRANSACTIONS_PROMPT,
@@ -19,62 +28,116 @@ from kyc_agent.prompts import (
 )
 
 
+# ---------------------------------------------------------------------------
+# Program reuse
+# ---------------------------------------------------------------------------
+
+# Unescaped "{variable}" placeholders in a prompt template
+_PLACEHOLDER_RE = re.compile(r"(?<!\{)\{(\w+)\}(?!\})")
+
+
+def _to_chat_prompt(prompt_template_str: str):
+    """
+    Split a prompt template into static instructions and per-partner data.
+    Every placeholder is replaced in the instructions by a reference to a
+    tagged block, and the blocks are sent as the user message. The system
+    message is then byte-identical across partners (and covers all of the
+    instructions, not just the text before the first placeholder), so the
+    provider can serve it from its prompt cache.
+    """
+    names = list(dict.fromkeys(_PLACEHOLDER_RE.findall(prompt_template_str)))
+    if not names:
+        return None
+    instructions = _PLACEHOLDER_RE.sub(
+        lambda m: f"<{m.group(1)}> (provided in the user message)", prompt_template_str
+    )
+    data = "\n\n".join(f"<{name}>\n{{{name}}}\n</{name}>" for name in names)
+    return ChatPromptTemplate(
+        message_templates=[
+            ChatMessage(role=MessageRole.SYSTEM, content=instructions.rstrip()),
+            ChatMessage(role=MessageRole.USER, content=data),
+        ]
+    )
+
+
+# (output_cls, prompt, id(llm)) -> (llm, program). The llm is kept in the value
+# so its id cannot be recycled by another object while the entry exists.
+_PROGRAMS: dict = {}
+_PROGRAMS_LOCK = threading.Lock()
+
+
+def _get_program(output_cls, prompt_template_str: str, llm) -> LLMTextCompletionProgram:
+    """Build an LLMTextCompletionProgram once per (schema, prompt, llm) and reuse it."""
+    key = (output_cls, prompt_template_str, id(llm))
+    with _PROGRAMS_LOCK:
+        entry = _PROGRAMS.get(key)
+        if entry is None:
+            chat_prompt = _to_chat_prompt(prompt_template_str)
+            if chat_prompt is not None:
+                program = LLMTextCompletionProgram.from_defaults(
+                    output_cls=output_cls,
+                    llm=llm,
+                    prompt=chat_prompt,
+                    verbose=False,
+                )
+            else:
+                program = LLMTextCompletionProgram.from_defaults(
+                    output_cls=output_cls,
+                    llm=llm,
+                    prompt_template_str=prompt_template_str,
+                    verbose=False,
+                )
+            entry = _PROGRAMS[key] = (llm, program)
+    return entry[1]
+
+
 # ---------------------------------------------------------------------------
 # Section 3: Purpose of Business Relationship
 # ---------------------------------------------------------------------------
 
+@cached_llm_call(PurposeOfBusinessRelationship, COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT)
 def _check_transactions_vs_purpose_of_br(
     kyc_purpose_of_br: str, kyc_transactions: str, llm
 ) -> PurposeOfBusinessRelationship:
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=PurposeOfBusinessRelationship,
-        llm=llm,
-        prompt_template_str=COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT,
-        verbose=False,
-    )
+    program = _get_program(PurposeOfBusinessRelationship, COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT, llm)
     return program(purpose_of_br=kyc_purpose_of_br, transactions=kyc_transactions)
 
 
+@cached_llm_call(CheckTransactionSummary, SUMMARIZE_TRANSACTIONS_PROMPT)
 def _summarise_transactions(kyc_transactions: str, llm) -> CheckTransactionSummary:
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=CheckTransactionSummary,
-        llm=llm,
-        prompt_template_str=SUMMARIZE_TRANSACTIONS_PROMPT,
-        verbose=False,
-    )
+    program = _get_program(CheckTransactionSummary, SUMMARIZE_TRANSACTIONS_PROMPT, llm)
     return program(kyc_transactions=kyc_transactions)
 
 
-def run_section3(
-    partner_info,
+def _section3_inputs(partner_info) -> tuple:
+    """Return (purpose_of_br, transactions) as prompt-ready strings."""
+    kyc_transactions = partner_info.kyc_dataset["transactions"]
+    kyc_purpose_of_br = partner_info.kyc_dataset["purpose_of_br"]
+    kyc_transactions_str = to_prompt_text(kyc_transactions) if kyc_transactions else "No kyc transactions extracted"
+    kyc_purpose_of_br_str = to_prompt_text(kyc_purpose_of_br) if kyc_purpose_of_br else "No kyc purpose of br text extracted"
+    return kyc_purpose_of_br_str, kyc_transactions_str
+
+
+def _apply_section3_results(
+    kyc_checks_output: dict,
     partner_name: str,
-    folder_name: str,
     ou_code_mapped: str,
-    kyc_checks_output: dict,
-    output_folder: str,
-    llm,
+    result_31: PurposeOfBusinessRelationship,
+    trx_summary: CheckTransactionSummary,
 ) -> None:
-    """Section 3: Purpose of the Business Relationship (checks 3.1, 3.2, 3.3)."""
-    print("START SECTION 3: Purpose of the business relationship")
-
-    kyc_transactions = partner_info.kyc_dataset["transactions"]
-    kyc_purpose_of_br = partner_info.kyc_dataset["purpose_of_br"]
-    kyc_transactions_str = str(kyc_transactions) if kyc_transactions else "No kyc transactions extracted"
-    kyc_purpose_of_br_str = str(kyc_purpose_of_br) if kyc_purpose_of_br else "No kyc purpose of br text extracted"
+    """Write the outcome of checks 3.1, 3.2 and 3.3 into kyc_checks_output."""
+    section = kyc_checks_output["purpose_of_business_relationships"]
+    reason_parts = []
 
     # Check 3.1 — BR vs transactions
-    print("check 3.1 started")
-    result_31 = _check_transactions_vs_purpose_of_br(kyc_purpose_of_br_str, kyc_transactions_str, llm)
-    save_json(result_31.json(), output_folder, folder_name, "section3_kyc_transactions_purpose_of_br.json")
-
     if not result_31.sufficient_explanation:
-        kyc_checks_output["purpose_of_business_relationships"]["status"] = False
+        section["status"] = False
     statement = (
         "The purpose of BR is in line with the additional information provided by KYC."
         if result_31.sufficient_explanation
         else "The purpose of BR is not in line with the additional information provided by KYC."
     )
-    kyc_checks_output["purpose_of_business_relationships"]["reason"] += (
+    reason_parts.append(
         f"\n\n**{partner_name}**\n{statement}\n"
         f"\n**Reasoning**: {result_31.reasoning}\n"
     )
@@ -83,42 +146,105 @@ def run_section3(
     # Check 3.2 — OU mapping
     print("check 3.2 started")
     if not ou_code_mapped:
-        kyc_checks_output["purpose_of_business_relationships"]["reason"] += (
+        reason_parts.append(
             f"\n**OU code mapping**: is NULL or empty or mapping did not work: {ou_code_mapped}\n"
         )
     else:
-        kyc_checks_output["purpose_of_business_relationships"]["reason"] += (
-            f"\n**OU code mapping found**: {ou_code_mapped}\n"
-        )
+        reason_parts.append(f"\n**OU code mapping found**: {ou_code_mapped}\n")
     print("check 3.2 succeeded")
 
     # Check 3.3 — Transaction summary
-    print("check 3.3 started")
-    trx_summary = _summarise_transactions(kyc_transactions_str, llm)
-    save_json(trx_summary.json(), output_folder, folder_name, "section3_kyc_transactions_summary.json")
-
     trx_lines = [str(x).strip() for x in trx_summary.transactions_details if str(x).strip()]
     trx_details = "\n".join(trx_lines) if trx_lines else "No transactions extracted."
-    kyc_checks_output["purpose_of_business_relationships"]["reason"] += (
-        f"\n**KYC transaction summary:**\n{trx_details}\n\n"
-    )
+    reason_parts.append(f"\n**KYC transaction summary:**\n{trx_details}\n\n")
     print("check 3.3 succeeded")
 
+    # Single concatenation instead of one reallocation per check
+    section["reason"] += "".join(reason_parts)
+
+
+def run_section3(
+    partner_info,
+    partner_name: str,
+    folder_name: str,
+    ou_code_mapped: str,
+    kyc_checks_output: dict,
+    output_folder: str,
+    llm,
+) -> None:
+    """Section 3: Purpose of the Business Relationship (checks 3.1, 3.2, 3.3)."""
+    if "purpose_of_business_relationships" in OUT_OF_SCOPE_CHECKS:
+        return
+    print("START SECTION 3: Purpose of the business relationship")
+
+    kyc_purpose_of_br_str, kyc_transactions_str = _section3_inputs(partner_info)
+
+    # Checks 3.1 and 3.3 are independent LLM calls — run them concurrently
+    print("check 3.1 and 3.3 started")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        fut_31 = executor.submit(
+            _check_transactions_vs_purpose_of_br, kyc_purpose_of_br_str, kyc_transactions_str, llm
+        )
+        fut_33 = executor.submit(_summarise_transactions, kyc_transactions_str, llm)
+        result_31 = fut_31.result()
+        trx_summary = fut_33.result()
+        save_futures = [
+            executor.submit(
+                save_json, result_31.dict(), output_folder, folder_name,
+                "section3_kyc_transactions_purpose_of_br.json",
+            ),
+            executor.submit(
+                save_json, trx_summary.dict(), output_folder, folder_name,
+                "section3_kyc_transactions_summary.json",
+            ),
+        ]
+        for fut in save_futures:
+            fut.result()
+
+    _apply_section3_results(kyc_checks_output, partner_name, ou_code_mapped, result_31, trx_summary)
+
 
 # ---------------------------------------------------------------------------
 # Section 4: Origin of Assets
 # ---------------------------------------------------------------------------
 
+@cached_llm_call(CompletenessOriginOfAssets, ORIGIN_OF_ASSET_PROMPT)
 def _check_origin_of_assets_completeness(origin_of_assets: str, llm) -> CompletenessOriginOfAssets:
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=CompletenessOriginOfAssets,
-        llm=llm,
-        prompt_template_str=ORIGIN_OF_ASSET_PROMPT,
-        verbose=False,
-    )
+    program = _get_program(CompletenessOriginOfAssets, ORIGIN_OF_ASSET_PROMPT, llm)
     return program(origin_of_assets=origin_of_assets)
 
 
+def _section4_input(partner_info) -> str:
+    """Return the origin of assets text as a prompt-ready string."""
+    origins = partner_info.kyc_dataset.get("origin_of_assets")
+    return to_prompt_text(origins) if origins else "No origins extracted."
+
+
+def _apply_section4_results(
+    kyc_checks_output: dict,
+    partner_name: str,
+    oa_result: CompletenessOriginOfAssets,
+) -> None:
+    """Write the outcome of the origin of assets check into kyc_checks_output."""
+    section = kyc_checks_output["origin_of_asset"]
+    if oa_result.complete:
+        statement = "Origin of assets description is complete."
+    else:
+        section["status"] = False
+        statement = "Origin of assets description is incomplete."
+    section["reason"] += (
+        f"\n\n**{partner_name}**\n{statement}\n\n"
+        f"**Reasoning**: {oa_result.reason}\n"
+    )
+
+
+def _apply_empty_origin_result(kyc_checks_output: dict, partner_name: str) -> None:
+    """Fail the origin of assets check without asking the LLM: there is nothing to assess."""
+    section = kyc_checks_output["origin_of_asset"]
+    section["status"] = False
+    section["reason"] += f"\n\n**{partner_name}**\nOrigin of assets description is empty.\n"
+
+
 def run_section4(
     partner_info,
     partner_name: str,
@@ -128,19 +254,98 @@ def run_section4(
     llm,
 ) -> None:
     """Section 4: Origin of Assets completeness check."""
-    origins = partner_info.kyc_dataset.get("origin_of_assets")
-    origin_of_assets = str(origins) if origins else "No origins extracted."
+    if "origin_of_asset" in OUT_OF_SCOPE_CHECKS:
+        return
+
+    # Nothing to assess - the outcome is known without asking the LLM
+    if not partner_info.kyc_dataset.get("origin_of_assets"):
+        _apply_empty_origin_result(kyc_checks_output, partner_name)
+        return
+
+    origin_of_assets = _section4_input(partner_info)
 
     oa_result = _check_origin_of_assets_completeness(origin_of_assets, llm)
-    save_json(oa_result.json(), output_folder, folder_name, "section4_origin_of_assets_llm.json")
+    save_json(oa_result.dict(), output_folder, folder_name, "section4_origin_of_assets_llm.json")
 
-    if oa_result.complete:
-        kyc_checks_output["origin_of_asset"]["reason"] += (
-            f"\n\n**{partner_name}**\nOrigin of assets description is complete.\n\n"
+    _apply_section4_results(kyc_checks_output, partner_name, oa_result)
+
+
+# ---------------------------------------------------------------------------
+# Combined: Sections 3 and 4 in a single LLM call
+# ---------------------------------------------------------------------------
+
+COMBINED_KYC_PROMPT = (
+    "You are reviewing the KYC documentation of a single client. Complete the three "
+    "independent tasks below and answer with ONE JSON object whose fields are "
+    "purpose_check (task 1), transactions_summary (task 2) and origin_completeness (task 3).\n\n"
+    "### Task 1 — purpose_check\n"
+    + COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT
+    + "\n\n### Task 2 — transactions_summary\n"
+    # Tasks 1 and 2 read the same transactions; one {transactions} block serves both
+    + SUMMARIZE_TRANSACTIONS_PROMPT.replace("{kyc_transactions}", "{transactions}")
+    + "\n\n### Task 3 — origin_completeness\n"
+    + ORIGIN_OF_ASSET_PROMPT
+)
+
+
+@cached_llm_call(CombinedKycAssessment, COMBINED_KYC_PROMPT)
+def _run_combined_assessment(
+    kyc_purpose_of_br: str, kyc_transactions: str, origin_of_assets: str, llm
+) -> CombinedKycAssessment:
+    program = _get_program(CombinedKycAssessment, COMBINED_KYC_PROMPT, llm)
+    return program(
+        purpose_of_br=kyc_purpose_of_br,
+        transactions=kyc_transactions,
+        origin_of_assets=origin_of_assets,
+    )
+
+
+def run_combined(
+    partner_info,
+    partner_name: str,
+    folder_name: str,
+    ou_code_mapped: str,
+    kyc_checks_output: dict,
+    output_folder: str,
+    llm,
+) -> None:
+    """Sections 3 and 4 (checks 3.1, 3.2, 3.3 and 4) with one LLM round-trip."""
+    if OUT_OF_SCOPE_CHECKS & {"purpose_of_business_relationships", "origin_of_asset"}:
+        # The combined call only pays off when both sections are in scope;
+        # the per-section runners skip whichever one is not.
+        run_section3(
+            partner_info, partner_name, folder_name, ou_code_mapped,
+            kyc_checks_output, output_folder, llm,
         )
-    else:
-        kyc_checks_output["origin_of_asset"]["status"] = False
-        kyc_checks_output["origin_of_asset"]["reason"] += (
-            f"\n\n**{partner_name}**\nOrigin of assets description is incomplete.\n\n"
+        run_section4(partner_info, partner_name, folder_name, kyc_checks_output, output_folder, llm)
+        return
+
+    # No origin of assets: section 4 is decided without the LLM, so only
+    # section 3 needs a call
+    if not partner_info.kyc_dataset.get("origin_of_assets"):
+        run_section3(
+            partner_info, partner_name, folder_name, ou_code_mapped,
+            kyc_checks_output, output_folder, llm,
         )
-    kyc_checks_output["origin_of_asset"]["reason"] += f"**Reasoning**: {oa_result.reason}\n"
+        _apply_empty_origin_result(kyc_checks_output, partner_name)
+        return
+
+    print("START SECTIONS 3 and 4: combined assessment")
+
+    kyc_purpose_of_br_str, kyc_transactions_str = _section3_inputs(partner_info)
+    origin_of_assets = _section4_input(partner_info)
+
+    combined = _run_combined_assessment(
+        kyc_purpose_of_br_str, kyc_transactions_str, origin_of_assets, llm
+    )
+
+    # Keep the per-section intermediate files so downstream consumers are unchanged
+    save_json(combined.purpose_check.dict(), output_folder, folder_name, "section3_kyc_transactions_purpose_of_br.json")
+    save_json(combined.transactions_summary.dict(), output_folder, folder_name, "section3_kyc_transactions_summary.json")
+    save_json(combined.origin_completeness.dict(), output_folder, folder_name, "section4_origin_of_assets_llm.json")
+
+    _apply_section3_results(
+        kyc_checks_output, partner_name, ou_code_mapped,
+        combined.purpose_check, combined.transactions_summary,
+    )
+    _apply_section4_results(kyc_checks_output, partner_name, combined.origin_completeness)
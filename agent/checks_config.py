@@ -0,0 +1,44 @@
+"""
+checks_config.py
+The KYC check catalogue: keys, display names and scope.
+"""
+
+from types import MappingProxyType
+
+KYC_CHECK_DISPLAY = MappingProxyType({
+    "sign_off": "1. Sign-Off",
+    "additional_sign_offs": "2. Additional Sign-Offs",
+    "purpose_of_business_relationships": "3. Purpose of Business Relationship",
+    "origin_of_asset": "4. Origin of Assets",
+    "corroboration": "5. Corroboration and Evidence",
+    "percentage_total_assets_explained": "6. Total Assets / Composition of Assets",
+    "remarks_on_total_assets_and_composition": "7. Remarks on Total Assets and Asset Composition",
+    "activity": "8. Activity",
+    "transactions": "9. Transactions",
+    "family_situation": "10. Family Situation",
+    "consistency_checks_within_kyc": "11.1 Consistency Checks within the KYC - role holders and ASM numbers",
+    "consistency_checks_within_kyc_contradiction_checks": "11.2 Consistency Checks within the KYC - contradiction checks: one field vs other fields",
+    "consistency_checks_with_previous_edd": "12. Consistency Checks with Previous EDD Assessment",
+    "scap_flags": "13. SCAP Flags",
+    "siap_flags": "14. SIAP Flags",
+})
+
+KYC_CHECK_KEYS = list(KYC_CHECK_DISPLAY)
+
+OUT_OF_SCOPE_CHECKS = frozenset({
+    "sign_off", "additional_sign_offs", "corroboration",
+    "transactions", "consistency_checks_within_kyc",
+    "consistency_checks_with_previous_edd",
+})
+
+
+def init_kyc_checks_output() -> dict:
+    """Return a fresh kyc_checks_output dict with status, reason and display_name."""
+    return {
+        check_name: {
+            "status": True,
+            "reason": "Out of scope currently." if check_name in OUT_OF_SCOPE_CHECKS else "",
+            "display_name": display_name,
+        }
+        for check_name, display_name in KYC_CHECK_DISPLAY.items()
+    }
@@ -0,0 +1,155 @@
+"""
+llm_cache.py
+On-disk cache for the LLM section-check calls.
+
+Results are keyed by SHA-256 of (prompt template, model id, call inputs) and
+stored as the Pydantic model's JSON under ~/.cache/kyc_agent/. Set
+KYC_CACHE_DISABLED=1 to bypass the cache entirely.
+
+An optional semantic layer (KYC_SEMANTIC_CACHE=1, needs sentence-transformers)
+embeds the call inputs and reuses the stored result of the nearest previous
+call of the same prompt when cosine similarity >= SEMANTIC_THRESHOLD. It is
+off by default: a near-match may belong to a different partner.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+
+# sentence-transformers is optional - the semantic layer is skipped without it
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_AVAILABLE = True
+except ImportError:
+    SEMANTIC_AVAILABLE = False
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "kyc_agent")
+SEMANTIC_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_THRESHOLD = 0.92
+
+_SEMANTIC_LOCK = threading.Lock()
+
+
+def _cache_disabled() -> bool:
+    return os.environ.get("KYC_CACHE_DISABLED") == "1"
+
+
+def _model_id(llm) -> str:
+    """Best-effort identifier of the deployed model behind *llm*."""
+    return str(getattr(llm, "model", None) or getattr(llm, "engine", None) or "")
+
+
+def _semantic_enabled() -> bool:
+    return SEMANTIC_AVAILABLE and os.environ.get("KYC_SEMANTIC_CACHE") == "1"
+
+
+@functools.lru_cache(maxsize=1)
+def _embedder():
+    return SentenceTransformer(SEMANTIC_MODEL_NAME)
+
+
+def _embed(inputs: dict):
+    """Unit-norm embedding of the call inputs."""
+    text = json.dumps(inputs, sort_keys=True, default=str)
+    return _embedder().encode([text], normalize_embeddings=True)[0].astype(np.float32)
+
+
+def _semantic_index_path(prompt_template: str, model_id: str) -> str:
+    """One index per (prompt, model) so results never cross check types."""
+    return os.path.join(CACHE_DIR, "semantic", f"{cache_key(prompt_template, model_id, {})}.npz")
+
+
+def _semantic_lookup(index_path: str, vector) -> str | None:
+    """Return the exact-cache key of the nearest stored call above threshold."""
+    if not os.path.exists(index_path):
+        return None
+    with np.load(index_path) as index:
+        embeddings, keys = index["embeddings"], index["keys"]
+    scores = embeddings @ vector
+    best = int(np.argmax(scores))
+    return str(keys[best]) if scores[best] >= SEMANTIC_THRESHOLD else None
+
+
+def _semantic_store(index_path: str, vector, key: str) -> None:
+    """Append (vector, key) to the index at *index_path*."""
+    with _SEMANTIC_LOCK:
+        embeddings, keys = vector[None, :], np.array([key])
+        if os.path.exists(index_path):
+            with np.load(index_path) as index:
+                embeddings = np.vstack([index["embeddings"], embeddings])
+                keys = np.concatenate([index["keys"], keys])
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, embeddings=embeddings, keys=keys)
+        os.replace(tmp_path, index_path)
+
+
+def cache_key(prompt_template: str, model_id: str, inputs: dict) -> str:
+    """Return the SHA-256 hex digest identifying one LLM call."""
+    payload = "\x1f".join(
+        [prompt_template, model_id, json.dumps(inputs, sort_keys=True, default=str)]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_llm_call(model_cls, prompt_template: str):
+    """
+    Decorator for check helpers of the form ``f(*inputs, llm) -> model_cls``.
+
+    On a hit the stored JSON is parsed back into *model_cls* and the LLM is
+    not called; on a miss the result is written to the cache.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _cache_disabled():
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            inputs = dict(bound.arguments)
+            llm = inputs.pop("llm", None)
+
+            key = cache_key(prompt_template, _model_id(llm), inputs)
+            cache_path = os.path.join(CACHE_DIR, f"{key}.json")
+
+            if os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return model_cls.parse_raw(f.read())
+
+            semantic = _semantic_enabled()
+            if semantic:
+                index_path = _semantic_index_path(prompt_template, _model_id(llm))
+                vector = _embed(inputs)
+                near_key = _semantic_lookup(index_path, vector)
+                if near_key is not None:
+                    near_path = os.path.join(CACHE_DIR, f"{near_key}.json")
+                    if os.path.exists(near_path):
+                        with open(near_path, "r", encoding="utf-8") as f:
+                            return model_cls.parse_raw(f.read())
+
+            result = func(*args, **kwargs)
+
+            # Write to a temp file first so concurrent partners never read a
+            # partially written entry.
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(result.json())
+            os.replace(tmp_path, cache_path)
+            if semantic:
+                _semantic_store(index_path, vector, key)
+            return result
+
+        return wrapper
+
+    return decorator
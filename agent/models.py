@@ -39,3 +39,15 @@ class CompletenessOriginOfAssets(BaseModel):
     reason: str = Field(
         description="The reason behind the completion status"
     )
+
+
+class CombinedKycAssessment(BaseModel):
+    purpose_check: PurposeOfBusinessRelationship = Field(
+        description="Task 1: whether the purpose of BR explains the KYC transactions"
+    )
+    transactions_summary: CheckTransactionSummary = Field(
+        description="Task 2: summary of the KYC transactions"
+    )
+    origin_completeness: CompletenessOriginOfAssets = Field(
+        description="Task 3: completeness of the origin of assets description"
+    )
@@ -0,0 +1,87 @@
+"""
+pdf_cache.py
+On-disk cache for process_kyc_pdf results.
+
+A partner folder is keyed by SHA-256 of its path, the parser version and the
+content + mtime of every file it contains (not only *.pdf: the extension may be
+upper-case, and process_kyc_pdf may read other inputs); the parsed partner
+object is pickled under ~/.cache/kyc_agent/pdf/. Bump PARSER_VERSION whenever
+process_kyc_pdf changes its output. Set KYC_CACHE_DISABLED=1 to bypass the cache.
+
+Only the PDF_CACHE_MAX_ENTRIES most recently used parses are kept.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+from kyc_agent.process_kyc_pdf import process_kyc_pdf
+
+PARSER_VERSION = "1"
+PDF_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "kyc_agent", "pdf")
+PDF_CACHE_MAX_ENTRIES = int(os.environ.get("KYC_PDF_CACHE_MAX_ENTRIES", "500"))
+
+
+def _folder_files(partner_folder: str) -> list[str]:
+    """Return every file under *partner_folder*, in a stable order."""
+    paths = []
+    for root, dirs, files in os.walk(partner_folder):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files))
+    return paths
+
+
+def _folder_key(partner_folder: str) -> str:
+    """Return the SHA-256 hex digest identifying the PDFs of *partner_folder*."""
+    digest = hashlib.sha256()
+    digest.update(PARSER_VERSION.encode("utf-8"))
+    digest.update(os.path.abspath(partner_folder).encode("utf-8"))
+    for path in _folder_files(partner_folder):
+        digest.update(path.encode("utf-8"))
+        digest.update(str(os.path.getmtime(path)).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _prune_cache() -> None:
+    """Delete the least recently used pickles beyond PDF_CACHE_MAX_ENTRIES."""
+    entries = []
+    for entry in os.scandir(PDF_CACHE_DIR):
+        if entry.name.endswith(".pkl"):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    entries.sort(reverse=True)
+    for _, path in entries[PDF_CACHE_MAX_ENTRIES:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def cached_process_kyc_pdf(partner_folder: str):
+    """process_kyc_pdf(partner_folder), served from disk when the PDFs are unchanged."""
+    if os.environ.get("KYC_CACHE_DISABLED") == "1":
+        return process_kyc_pdf(partner_folder)
+
+    cache_path = os.path.join(PDF_CACHE_DIR, f"{_folder_key(partner_folder)}.pkl")
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            kyc_case = pickle.load(f)
+        # mtime records the last use, for LRU eviction
+        os.utime(cache_path)
+        return kyc_case
+
+    kyc_case = process_kyc_pdf(partner_folder)
+
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(kyc_case, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    _prune_cache()
+    return kyc_case
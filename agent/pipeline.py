@@ -8,31 +8,24 @@ Usage:
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
 
 from kyc_agent.utils import (
     build_llm,
+    index_partners,
     load_edd_case,
     resolve_ou_mapping,
     resolve_partner_info,
     serialise_kyc_dataset,
 )
 from kyc_agent.checks import run_section3, run_section4
-
-KYC_CHECK_KEYS = [
-    "sign_off", "additional_sign_offs", "purpose_of_business_relationships",
-    "origin_of_asset", "corroboration", "percentage_total_assets_explained",
-    "remarks_on_total_assets_and_composition", "activity", "transactions",
-    "family_situation", "consistency_checks_within_kyc",
-    "consistency_checks_within_kyc_contradiction_checks",
-    "consistency_checks_with_previous_edd", "scap_flags", "siap_flags",
-]
-
-OUT_OF_SCOPE_CHECKS = [
-    "sign_off", "additional_sign_offs", "corroboration",
-    "transactions", "consistency_checks_within_kyc",
-    "consistency_checks_with_previous_edd",
-]
+# KYC_CHECK_KEYS and OUT_OF_SCOPE_CHECKS are re-exported for existing importers
+from kyc_agent.checks_config import (  # noqa: F401
+    KYC_CHECK_KEYS,
+    OUT_OF_SCOPE_CHECKS,
+    init_kyc_checks_output,
+)
 
 
 def run_kyc_checks_pipeline(
@@ -41,40 +34,17 @@ def run_kyc_checks_pipeline(
     ou_code_data_path: str,
     edd_name: str,
     case_number: str,
-    kyc_to_edd_partner_matches: dict,
-    client_histories_parsed: list,
+    edd_to_kyc: dict,
+    kyc_to_info: dict,
     edd_text_parser,
 ) -> dict:
     """
     Run the full KYC checks pipeline.
+    edd_to_kyc and kyc_to_info are the partner lookups from utils.index_partners.
     Returns kyc_checks_output dict with status and reason for each check section.
     """
     # Initialise output structure
-    kyc_checks_output = {}
-    dict_kyc_checks_name_display = {
-        "sign_off": "1. Sign-Off",
-        "additional_sign_offs": "2. Additional Sign-Offs",
-        "purpose_of_business_relationships": "3. Purpose of Business Relationship",
-        "origin_of_asset": "4. Origin of Assets",
-        "corroboration": "5. Corroboration and Evidence",
-        "percentage_total_assets_explained": "6. Total Assets / Composition of Assets",
-        "remarks_on_total_assets_and_composition": "7. Remarks on Total Assets and Asset Composition",
-        "activity": "8. Activity",
-        "transactions": "9. Transactions",
-        "family_situation": "10. Family Situation",
-        "consistency_checks_within_kyc": "11.1 Consistency Checks within the KYC - role holders and ASM numbers",
-        "consistency_checks_within_kyc_contradiction_checks": "11.2 Consistency Checks within the KYC - contradiction checks: one field vs other fields",
-        "consistency_checks_with_previous_edd": "12. Consistency Checks with Previous EDD Assessment",
-        "scap_flags": "13. SCAP Flags",
-        "siap_flags": "14. SIAP Flags",
-    }
-    for check_name, display_name in dict_kyc_checks_name_display.items():
-        kyc_checks_output[check_name] = {}
-        kyc_checks_output[check_name]["status"] = True
-        kyc_checks_output[check_name]["reason"] = ""
-        kyc_checks_output[check_name]["display_name"] = display_name
-        if check_name in OUT_OF_SCOPE_CHECKS:
-            kyc_checks_output[check_name]["reason"] = "Out of scope currently."
+    kyc_checks_output = init_kyc_checks_output()
 
     # Load EDD
     edd_case = load_edd_case(input_folder, edd_text_parser)
@@ -82,9 +52,7 @@ def run_kyc_checks_pipeline(
     ou_code_mapped = resolve_ou_mapping(edd_case, ou_code_data_path)
 
     # Resolve partner
-    kyc_folder, partner_info = resolve_partner_info(
-        kyc_to_edd_partner_matches, client_histories_parsed, edd_name
-    )
+    kyc_folder, partner_info = resolve_partner_info(edd_to_kyc, kyc_to_info, edd_name)
     if kyc_folder is None or partner_info is None:
         print("Could not resolve partner info. Aborting pipeline.")
         return kyc_checks_output
@@ -166,20 +134,29 @@ if __name__ == "__main__":
     print(f"Available attributes: {dir(client_histories_parsed)}")
     print("kyc_dataset keys:", client_histories_parsed[0].kyc_dataset.keys())
 
-    iteration = 0
+    # --- Index partner lookups once for all EDD partners ---
+    edd_to_kyc, kyc_to_info = index_partners(kyc_to_edd_partner_matches, client_histories_parsed)
 
     # --- Run pipeline once per EDD partner ---
-    for edd_name in edd_partner_names:
-        print(f"\nRunning pipeline for: {edd_name}")
-        results = run_kyc_checks_pipeline(
-            input_folder=INPUT_FOLDER,
-            output_folder=OUTPUT_FOLDER,
-            ou_code_data_path=OU_CODE_DATA_PATH,
-            edd_name=edd_name,
-            case_number=case_number,
-            kyc_to_edd_partner_matches=kyc_to_edd_partner_matches,
-            client_histories_parsed=client_histories_parsed,
-            edd_text_parser=edd_text_parser,
-        )
-        print(f"Done: {edd_name}")
-        print(results)
\ No newline at end of file
+    # Partners are independent and each run is dominated by blocking LLM calls,
+    # so run them concurrently; 8 workers keeps us inside the Azure rate limits.
+    if edd_partner_names:
+        with ThreadPoolExecutor(max_workers=min(8, len(edd_partner_names))) as executor:
+            futures = {
+                edd_name: executor.submit(
+                    run_kyc_checks_pipeline,
+                    input_folder=INPUT_FOLDER,
+                    output_folder=OUTPUT_FOLDER,
+                    ou_code_data_path=OU_CODE_DATA_PATH,
+                    edd_name=edd_name,
+                    case_number=case_number,
+                    edd_to_kyc=edd_to_kyc,
+                    kyc_to_info=kyc_to_info,
+                    edd_text_parser=edd_text_parser,
+                )
+                for edd_name in edd_partner_names
+            }
+            for edd_name, future in futures.items():
+                results = future.result()
+                print(f"Done: {edd_name}")
+                print(results)
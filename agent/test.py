@@ -1,4 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from neuralkyc.data.datasets.legal_entity import LegalEntity
+from kyc_agent.checks_config import OUT_OF_SCOPE_CHECKS, init_kyc_checks_output
+from kyc_agent.utils import build_llm, to_prompt_text
+from kyc_agent.llm_cache import cached_llm_call
 
 edd_case_path_folder = glob(INPUT_FOLDER + "/DD-**")[2]
 edd_case_path_ex = glob(edd_case_path_folder + "/DD-*.txt")[0]
@@ -41,25 +46,8 @@ except Exception as e:
     ou_code_mapped = ""
     print("EDD OU code not found and/or mapping failed")
 
-kyc_checks_output = {}
+kyc_checks_output = init_kyc_checks_output()
 raw_data = {"consistency_checks_within_kyc_contradiction_checks": {}}
-dict_kyc_checks_name_display = {
-    "sign_off": "1. Sign-Off",
-    "additional_sign_offs": "2. Additional Sign-Offs",
-    "purpose_of_business_relationships": "3. Purpose of Business Relationship",
-    "origin_of_asset": "4. Origin of Assets",
-    "corroboration": "5. Corroboration and Evidence",
-    "percentage_total_assets_explained": "6. Total Assets / Composition of Assets",
-    "remarks_on_total_assets_and_composition": "7. Remarks on Total Assets and Asset Composition",
-    "activity": "8. Activity",
-    "transactions": "9. Transactions",
-    "family_situation": "10. Family Situation",
-    "consistency_checks_within_kyc": "11.1 Consistency Checks within the KYC - role holders and ASM numbers",
-    "consistency_checks_within_kyc_contradiction_checks": "11.2 Consistency Checks within the KYC - contradiction checks: one field vs other fields",
-    "consistency_checks_with_previous_edd": "12. Consistency Checks with Previous EDD Assessment",
-    "scap_flags": "13. SCAP Flags",
-    "siap_flags": "14. SIAP Flags",
-}
 
 kyc_folder = None
 for match_record in kyc_to_edd_partner_matches["mappings"]:
@@ -97,6 +85,9 @@ if kyc_folder is not None and partner_info is not None:
 # =============================================
 print("START SECTION 3: Purpose of the business relationship")
 
+# Reason text is collected in parts and joined once, instead of one += per line
+section3_reason_parts = []
+
 # Check 1: compare the purpose of BR is in line with the additional information provided by kyc
 print("check 3.1 started")
 print(partner_info)
@@ -105,13 +96,13 @@ kyc_purpose_of_br = partner_info.kyc_dataset["purpose_of_br"]
 print("kyc_transactions", kyc_transactions)
 print("kyc_purpose_of_br", kyc_purpose_of_br)
 kyc_transactions_str = (
-    str(kyc_transactions)
+    to_prompt_text(kyc_transactions)
     if kyc_transactions
     else "No kyc transactions extracted"
 )
 
 kyc_purpose_of_br_str = (
-    str(kyc_purpose_of_br)
+    to_prompt_text(kyc_purpose_of_br)
     if kyc_purpose_of_br
     else "No kyc purpose of br text extracted"
 )
@@ -120,28 +111,24 @@ class PurposeOfBusinessRelationship(BaseModel):
     sufficient_explanation: bool = Field(description="Whether the details provided in kyc purpose of br justify the transaction value present in kyc transactions")
     reasoning: str = Field(description="The reason behind the explanation robustness")
 
-llm = AzureOpenAI(
-    engine="gpt-4o",
-    use_azure_ad=True,
-    azure_ad_token_provider=get_bearer_token_provider(
-        DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-    )
+# Shared client: one credential chain and pooled HTTP session per process
+llm = build_llm()
+
+
+# Programs are built once and reused for every call
+purpose_program = LLMTextCompletionProgram.from_defaults(
+    output_cls=PurposeOfBusinessRelationship,
+    llm=llm,
+    prompt_template_str=COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT,
+    verbose=False
 )
 
 
+# Exact (and, with KYC_SEMANTIC_CACHE=1, semantic) cache in front of each check
+@cached_llm_call(PurposeOfBusinessRelationship, COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT)
 def check_transactions_in_line_with_purpose_of_br(kyc_purpose_of_br, kyc_transactions, llm):
-    """Extract persons and companies using LlamaIndex"""
-
-    # Limit text to 15000 characters
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=PurposeOfBusinessRelationship,
-        llm=llm,
-        prompt_template_str=COMPARE_TRANSACTIONS_PURPOSE_OF_BR_PROMPT,
-        verbose=False
-    )
-
-    result = program(purpose_of_br=kyc_purpose_of_br, transactions=kyc_transactions)
-    return result
+    """Compare the KYC purpose of BR with the KYC transactions"""
+    return purpose_program(purpose_of_br=kyc_purpose_of_br, transactions=kyc_transactions)
 
 
 # TODO HERE
@@ -151,50 +138,44 @@ def check_transactions_in_line_with_purpose_of_br(kyc_purpose_of_br, kyc_transac
 #     )
 # )
 
-result = check_transactions_in_line_with_purpose_of_br(kyc_purpose_of_br_str, kyc_transactions_str, llm)
-print(type(result))
+# Out-of-scope checks are skipped entirely, as in checks.run_combined
+if "purpose_of_business_relationships" not in OUT_OF_SCOPE_CHECKS:
+    result = check_transactions_in_line_with_purpose_of_br(kyc_purpose_of_br_str, kyc_transactions_str, llm)
+    print(type(result))
 
-print(result)
-print("save json")
-save_json(
-    result.json(),
-    OUTPUT_FOLDER,
-    folder_name,
-    "section3_kyc_transactions_purpose_of_br.json",
-)
-print(
-    "Intermediate data saved: data kyc transactions comparison with purpose of br"
-)
+    print(result)
+    print("save json")
+    save_json(
+        result.json(),
+        OUTPUT_FOLDER,
+        folder_name,
+        "section3_kyc_transactions_purpose_of_br.json",
+    )
+    print(
+        "Intermediate data saved: data kyc transactions comparison with purpose of br"
+    )
 
-transactions_sufficiency_checks = result.sufficient_explanation
-transactions_sufficiency_checks_reasoning = result.reasoning
+    transactions_sufficiency_checks = result.sufficient_explanation
+    transactions_sufficiency_checks_reasoning = result.reasoning
 
-# Final check
-statement = "The purpose of BR is in line with the additional information provided by KYC."
-if not transactions_sufficiency_checks:
-    kyc_checks_output["purpose_of_business_relationships"]["status"] = False
-    statement = "The purpose of BR is not in line with the additional information provided by KYC."
+    # Final check
+    statement = "The purpose of BR is in line with the additional information provided by KYC."
+    if not transactions_sufficiency_checks:
+        kyc_checks_output["purpose_of_business_relationships"]["status"] = False
+        statement = "The purpose of BR is not in line with the additional information provided by KYC."
 
-kyc_checks_output["purpose_of_business_relationships"][
-    "reason"
-] += f"\n\n**{partner_name}**\n{statement}\n"
-kyc_checks_output["purpose_of_business_relationships"][
-    "reason"
-] += f"\n**Reasoning**: {transactions_sufficiency_checks_reasoning}\n"
+    section3_reason_parts.append(f"\n\n**{partner_name}**\n{statement}\n")
+    section3_reason_parts.append(f"\n**Reasoning**: {transactions_sufficiency_checks_reasoning}\n")
 
-print("check 3.1 succeeded")
+    print("check 3.1 succeeded")
 # next step: check this condition is True or False
 
 # Check 2: add to the reasoning the information related to OU and the adequate mapping related to it
 print("check 3.2 started")
 if ou_code_mapped == "" or ou_code_mapped is None:
-    kyc_checks_output["purpose_of_business_relationships"][
-        "reason"
-    ] += f"\n**OU code mapping**: is NULL or empty or mapping did not work: {ou_code_mapped} \n"
+    section3_reason_parts.append(f"\n**OU code mapping**: is NULL or empty or mapping did not work: {ou_code_mapped} \n")
 else:
-    kyc_checks_output["purpose_of_business_relationships"][
-        "reason"
-    ] += f"\n**OU code mapping found**: {ou_code_mapped}\n"
+    section3_reason_parts.append(f"\n**OU code mapping found**: {ou_code_mapped}\n")
 
 print("check 3.2 succeeded")
 
@@ -214,16 +195,17 @@ class CheckTransactionSummary(BaseModel):
     )
 
 
-def check_transaction_summary(kyc_transactions, llm):
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=CheckTransactionSummary,
-        llm=llm,
-        prompt_template_str=SUMMARIZE_TRANSACTIONS_PROMPT,
-        verbose=False
-    )
+transaction_summary_program = LLMTextCompletionProgram.from_defaults(
+    output_cls=CheckTransactionSummary,
+    llm=llm,
+    prompt_template_str=SUMMARIZE_TRANSACTIONS_PROMPT,
+    verbose=False
+)
 
-    result = program(kyc_transactions=kyc_transactions)
-    return result
+
+@cached_llm_call(CheckTransactionSummary, SUMMARIZE_TRANSACTIONS_PROMPT)
+def check_transaction_summary(kyc_transactions, llm):
+    return transaction_summary_program(kyc_transactions=kyc_transactions)
 
 
 llm_response_kyc_transaction_summary = check_transaction_summary(
@@ -251,12 +233,9 @@ trx_details = (
     else "No transactions extracted."
 )
 
-kyc_checks_output["purpose_of_business_relationships"][
-    "reason"
-] += "\n**KYC transaction summary:**"
-kyc_checks_output["purpose_of_business_relationships"][
-    "reason"
-] += f"\n{trx_details}\n\n"
+section3_reason_parts.append("\n**KYC transaction summary:**")
+section3_reason_parts.append(f"\n{trx_details}\n\n")
+kyc_checks_output["purpose_of_business_relationships"]["reason"] += "".join(section3_reason_parts)
 
 trx_summaries = [
     str(x).strip()
@@ -269,8 +248,29 @@ trx_details = (
     else "No transactions extracted."
 )
 
-for partner_info in client_histories_parsed:
-    iteration += 1
+
+class completeness_origin_of_assets(BaseModel):
+    complete: bool = Field(description="Whether the origin of assets is complete or not")
+    reason: str = Field(description="The reason behind the completion status")
+
+
+origin_of_assets_program = LLMTextCompletionProgram.from_defaults(
+    output_cls=completeness_origin_of_assets,
+    llm=llm,
+    prompt_template_str=ORIGIN_OF_ASSET_PROMPT,
+    verbose=False
+)
+
+
+@cached_llm_call(completeness_origin_of_assets, ORIGIN_OF_ASSET_PROMPT)
+def origin_of_assets_completeness(text, llm):
+    return origin_of_assets_program(origin_of_assets=text)
+
+
+def run_partner_checks(partner_info):
+    """Checks for one KYC partner, on its own kyc_checks_output"""
+    # A fresh output per partner, so no partner inherits another's reasons
+    partner_checks_output = init_kyc_checks_output()
     # Create a dictionary with attributes that do not have double underscores at the start or end
     print(f"Available attributes: {dir(partner_info.kyc_dataset)}")
     print(f"Instance type: {type(partner_info.kyc_dataset)}")
@@ -302,49 +302,42 @@ for partner_info in client_histories_parsed:
     # =============================================
     # Section 4: Origin of assets
     # =============================================
-    origins = partner_info.kyc_dataset.get("origin_of_assets")
-    origin_of_assets = str(origins) if origins else "No origins extracted."
-    # TODO HERE
-
-    class completeness_origin_of_assets(BaseModel):
-        complete: bool = Field(description="Whether the origin of assets is complete or not")
-        reason: str = Field(description="The reason behind the completion status")
-
-    def origin_of_assets_completeness(text, llm):
-        # Limit text to 15000 characters
-        program = LLMTextCompletionProgram.from_defaults(
-            output_cls=completeness_origin_of_assets,
-            llm=llm,
-            prompt_template_str=ORIGIN_OF_ASSET_PROMPT,
-            verbose=False
+    if "origin_of_asset" not in OUT_OF_SCOPE_CHECKS:
+        origins = partner_info.kyc_dataset.get("origin_of_assets")
+        origin_of_assets = to_prompt_text(origins) if origins else "No origins extracted."
+        # TODO HERE
+
+        oa_llm_result = origin_of_assets_completeness(origin_of_assets, llm)
+
+        save_json(
+            oa_llm_result.json(),
+            OUTPUT_FOLDER,
+            folder_name,
+            "section4_origin_of_assets_llm.json",
         )
 
-        result = program(origin_of_assets=origin_of_assets)
-        return result
+        section = partner_checks_output["origin_of_asset"]
+        if oa_llm_result.complete:
+            statement = "Origin of assets description is complete."
+        else:
+            section["status"] = False
+            statement = "Origin of assets description is incomplete."
+        section["reason"] += "".join([
+            f"\n\n**{partner_name}**\n{statement}\n\n",
+            "**Reasoning**: " + oa_llm_result.reason + "\n",
+        ])
 
-    oa_llm_result = origin_of_assets_completeness(origin_of_assets, llm)
+    # =============================================
+    # Section 6: Total assets
+    # =============================================
 
-    save_json(
-        oa_llm_result.json(),
-        OUTPUT_FOLDER,
-        folder_name,
-        "section4_origin_of_assets_llm.json",
-    )
+    return partner_name, partner_checks_output
 
-    if oa_llm_result.complete == "true":
-        kyc_checks_output["origin_of_asset"][
-            "reason"
-        ] += f"\n\n**{partner_name}**\nOrigin of assets description is complete.\n\n"
-    else:
-        kyc_checks_output["origin_of_asset"]["status"] = False
-        kyc_checks_output["origin_of_asset"][
-            "reason"
-        ] += f"\n\n**{partner_name}**\nOrigin of assets description is incomplete.\n\n"
-
-    kyc_checks_output["origin_of_asset"]["reason"] += (
-        "**Reasoning**: " + oa_llm_result.reason + "\n"
-    )
 
-    # =============================================
-    # Section 6: Total assets
-    # =============================================
\ No newline at end of file
+# Partners are independent and the checks are dominated by blocking LLM calls,
+# so run them on a thread pool (as agent_orchestrator does per EDD partner)
+partner_checks_outputs = {}
+if client_histories_parsed:
+    with ThreadPoolExecutor(max_workers=min(8, len(client_histories_parsed))) as executor:
+        for partner_name, partner_checks_output in executor.map(run_partner_checks, client_histories_parsed):
+            partner_checks_outputs[partner_name] = partner_checks_output
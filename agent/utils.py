@@ -3,25 +3,54 @@ utils.py
 Shared helpers: I/O, serialisation, LLM client, EDD loading, partner resolution.
 """
 
+import copy
+import csv
+import dataclasses
+import functools
 import os
 import json
-from glob import glob
 from typing import Any
 
-import pandas as pd
+import httpx
 from azure.identity import DefaultAzureCredential
 from azure.core.credentials import get_bearer_token_provider
 from llama_index.llms import AzureOpenAI
 
+# orjson is optional - save_json falls back to the stdlib encoder without it
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# msgpack is optional - intermediate artifacts fall back to JSON without it
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# h2 is optional - the LLM client falls back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 
 # ---------------------------------------------------------------------------
 # LLM
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=1)
 def build_llm() -> AzureOpenAI:
-    """Instantiate and return the Azure OpenAI LLM client."""
+    """Return the process-wide Azure OpenAI LLM client (one pooled HTTP session)."""
     return AzureOpenAI(
         engine="gpt-4o",
+        http_client=httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        ),
         use_azure_ad=True,
         azure_ad_token_provider=get_bearer_token_provider(
             DefaultAzureCredential(),
@@ -40,13 +69,26 @@ def save_json(data: dict | str, output_folder: str, folder_name: str, filename:
     os.makedirs(output_dir, exist_ok=True)
     save_path = os.path.join(output_dir, filename)
     if isinstance(data, str):
-        with open(save_path, "w", encoding="utf-8") as f:
-            f.write(data)
+        with open(save_path, "wb") as f:
+            f.write(data.encode("utf-8"))
+    elif ORJSON_AVAILABLE:
+        # Non-str keys are stringified, as json.dump does in the fallback below
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        with open(save_path, "wb") as f:
+            f.write(orjson.dumps(data, default=custom_serializer, option=option))
     else:
         with open(save_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
 
 
+def save_msgpack(data: dict, output_folder: str, folder_name: str, filename: str) -> None:
+    """Write *data* as msgpack to output_folder/folder_name/filename."""
+    output_dir = os.path.join(output_folder, folder_name)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, filename), "wb") as f:
+        f.write(msgpack.packb(data, default=custom_serializer, use_bin_type=True))
+
+
 def custom_serializer(value: Any) -> Any:
     """Fallback serialiser for non-JSON-native types."""
     if hasattr(value, "dict"):
@@ -56,19 +98,47 @@ def custom_serializer(value: Any) -> Any:
     return str(value)
 
 
-def serialise_kyc_dataset(partner_info, output_folder: str, folder_name: str) -> dict:
-    """Dump all non-dunder, non-callable kyc_dataset attributes to JSON."""
-    excluded = {"_abc_impl", "abc_omple"}
-    kyc_dict = {
-        attr: custom_serializer(getattr(partner_info.kyc_dataset, attr))
-        for attr in dir(partner_info.kyc_dataset)
-        if (
-            not (attr.startswith("__") and attr.endswith("__"))
-            and attr not in excluded
-            and not callable(getattr(partner_info.kyc_dataset, attr))
+def to_prompt_text(value: Any) -> str:
+    """Render a KYC field for a prompt: strings as-is, containers as compact JSON.
+
+    Empty values are kept: a missing origin or transaction amount is itself
+    evidence the checks reason about.
+    """
+    if isinstance(value, str):
+        return value
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, default=custom_serializer, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(value, default=custom_serializer, ensure_ascii=False, separators=(",", ":"))
+
+
+def _dataset_attribute_names(dataset) -> list[str]:
+    """Return dataclass fields, or instance attributes plus properties, of *dataset*."""
+    if dataclasses.is_dataclass(dataset):
+        return [f.name for f in dataclasses.fields(dataset)]
+    names = dict.fromkeys(getattr(dataset, "__dict__", {}))
+    for klass in type(dataset).__mro__:
+        names.update(
+            (name, None) for name, member in vars(klass).items() if isinstance(member, property)
         )
-    }
-    save_json(kyc_dict, output_folder, folder_name, "kyc_pdf_parser_data.json")
+    return list(names)
+
+
+def serialise_kyc_dataset(partner_info, output_folder: str, folder_name: str) -> dict:
+    """Dump all non-dunder, non-callable kyc_dataset attributes (msgpack, else JSON)."""
+    dataset = partner_info.kyc_dataset
+    kyc_dict = {}
+    for attr in _dataset_attribute_names(dataset):
+        if attr.startswith("__") and attr.endswith("__"):
+            continue
+        value = getattr(dataset, attr)
+        if not callable(value):
+            kyc_dict[attr] = custom_serializer(value)
+
+    # Intermediate artifact read only by this pipeline - no need for JSON
+    if MSGPACK_AVAILABLE:
+        save_msgpack(kyc_dict, output_folder, folder_name, "kyc_pdf_parser_data.msgpack")
+    else:
+        save_json(kyc_dict, output_folder, folder_name, "kyc_pdf_parser_data.json")
     return kyc_dict
 
 
@@ -76,63 +146,95 @@ def serialise_kyc_dataset(partner_info, output_folder: str, folder_name: str) ->
 # EDD loading & partner resolution
 # ---------------------------------------------------------------------------
 
+def _dd_entries(path: str, suffix: str = "") -> list[str]:
+    """Return the sorted DD-* entries of *path* ending in *suffix*, in one scandir pass."""
+    with os.scandir(path) as entries:
+        return sorted(
+            entry.path
+            for entry in entries
+            if entry.name.startswith("DD-") and entry.name.endswith(suffix)
+        )
+
+
+def read_edd_text(path: str) -> str:
+    """Read a DD text file (Latin-1), with universal newlines."""
+    with open(path, "r", encoding="latin-1", newline=None) as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_edd_cached(path: str, mtime: float, size: int, edd_text_parser) -> dict:
+    """Parse the DD text file once per (path, mtime, size, parser)."""
+    return edd_text_parser.edd_info_parsing(read_edd_text(path))
+
+
 def load_edd_case(input_folder: str, edd_text_parser) -> dict:
     """Locate and parse the EDD case file, returning the parsed case dict."""
-    edd_case_path_folder = glob(input_folder + "/DD-**")[2]
-    edd_case_path_ex = glob(edd_case_path_folder + "/DD-*.txt")[0]
+    edd_case_path_folder = _dd_entries(input_folder)[2]
 
     try:
-        edd_case_path = glob(edd_case_path_folder + "/DD-*.txt")[0]
+        edd_case_path = _dd_entries(edd_case_path_folder, ".txt")[0]
         print(f"EDD case path: {edd_case_path}")
     except IndexError:
         raise FileNotFoundError(f"No DD-*.txt file found in {edd_case_path_folder}")
 
-    with open(edd_case_path_ex, "r", encoding="ISO-8859-1") as f:
-        edd_raw_text = f.read()
+    # The pipeline loads the same case once per partner - parse it only once.
+    # Callers get their own copy so the cached dict is never mutated.
+    st = os.stat(edd_case_path)
+    return copy.deepcopy(
+        _parse_edd_cached(edd_case_path, st.st_mtime, st.st_size, edd_text_parser)
+    )
+
 
-    return edd_text_parser.edd_info_parsing(edd_raw_text)
+@functools.lru_cache(maxsize=4)
+def _load_ou_map(ou_code_data_path: str) -> dict[str, str]:
+    """Read the OU code CSV once into an orgUnitCode -> managingOrgUnitName dict.
+
+    Duplicate codes keep their first row, as the original row-by-row lookup did.
+    """
+    mapping: dict[str, str] = {}
+    with open(ou_code_data_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            mapping.setdefault(row["orgUnitCode"], row["managingOrgUnitName"])
+    return mapping
 
 
 def resolve_ou_mapping(edd_case: dict, ou_code_data_path: str) -> str:
     """Look up the OU name for the EDD org unit. Returns empty string on failure."""
     edd_ou = edd_case["org_unit"]
-    ou_df = pd.read_csv(ou_code_data_path)[["orgUnitCode", "managingOrgUnitName"]]
-    try:
-        row = ou_df[ou_df["orgUnitCode"] == edd_ou]
-        ou_name = row["managingOrgUnitName"].values[0]
-        ou_code = row["orgUnitCode"].values[0]
-        mapped = f"name - {ou_name}, code - {ou_code}"
-        print(f"OU mapping found: {mapped}")
-        return mapped
-    except Exception:
+    ou_name = _load_ou_map(ou_code_data_path).get(str(edd_ou))
+    if not ou_name:
         print("EDD OU code not found and/or mapping failed")
         return ""
+    mapped = f"name - {ou_name}, code - {edd_ou}"
+    print(f"OU mapping found: {mapped}")
+    return mapped
+
+
+def index_partners(kyc_to_edd_partner_matches: dict, client_histories_parsed: list) -> tuple:
+    """
+    Build the lookups used by resolve_partner_info, once per case.
+    Returns (edd_to_kyc, kyc_to_info); the first match wins on duplicate names.
+    """
+    edd_to_kyc = {}
+    for r in kyc_to_edd_partner_matches["mappings"]:
+        edd_to_kyc.setdefault(r["matched_edd_name"], r["kyc_partner_name"])
+    kyc_to_info = {}
+    for info in client_histories_parsed:
+        kyc_to_info.setdefault(info.partner_name, info)
+    return edd_to_kyc, kyc_to_info
 
 
-def resolve_partner_info(
-    kyc_to_edd_partner_matches: dict,
-    client_histories_parsed: list,
-    edd_name: str,
-):
+def resolve_partner_info(edd_to_kyc: dict, kyc_to_info: dict, edd_name: str):
     """
     Find the KYC folder name and partner_info object for *edd_name*.
     Returns (kyc_folder, partner_info) — either may be None if not found.
     """
-    kyc_folder = next(
-        (
-            r["kyc_partner_name"]
-            for r in kyc_to_edd_partner_matches["mappings"]
-            if r["matched_edd_name"] == edd_name
-        ),
-        None,
-    )
+    kyc_folder = edd_to_kyc.get(edd_name)
     if kyc_folder:
         print("verification1 completed")
 
-    partner_info = next(
-        (info for info in client_histories_parsed if info.partner_name == kyc_folder),
-        None,
-    )
+    partner_info = kyc_to_info.get(kyc_folder)
     if partner_info:
         print("verification2 completed")
 
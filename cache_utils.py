@@ -0,0 +1,187 @@
+"""
+Cache Utility Functions for the Pipeline Steps
+On-disk cache for the LlamaIndex program calls made by step1-step6
+
+Results are keyed by SHA-256 of (output model, prompt template, model name
+and sampling settings, call inputs). The inputs carry the document text, so
+re-uploading the same document is served from disk, and editing a prompt
+invalidates its entries. Entries live under ~/.cache/rag_app/ (RAG_CACHE_DIR
+overrides it). Set RAG_CACHE_DISABLED=1 to bypass the cache.
+
+Entries unused for RAG_CACHE_TTL_DAYS (default 30) are treated as misses, and
+once the cache holds more than RAG_CACHE_MAX_ENTRIES (default 10000) files the
+least recently used ones are deleted.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from llama_index.core.program import LLMTextCompletionProgram
+from llama_index.core.prompts import PromptTemplate
+
+# Outside the repo by default: entries hold extracted client document text
+CACHE_DIR = Path(os.environ.get("RAG_CACHE_DIR", Path.home() / ".cache" / "rag_app"))
+CACHE_TTL_SECONDS = float(os.environ.get("RAG_CACHE_TTL_DAYS", "30")) * 24 * 3600
+CACHE_MAX_ENTRIES = int(os.environ.get("RAG_CACHE_MAX_ENTRIES", "10000"))
+
+# Extra attempts when the completion does not parse into the output model
+VALIDATION_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 1.0
+
+# Appended to the prompt on a retry; the error is cut to MAX_FEEDBACK_CHARS
+RETRY_FEEDBACK = "\n\nYour previous answer could not be parsed: {error}\nReturn output that matches the requested schema exactly.\n"
+MAX_FEEDBACK_CHARS = 1000
+
+# Programs built so far, keyed by (output model, prompt template, id(llm))
+_PROGRAMS = {}
+
+# Each step is a short-lived process, so the cache is pruned once per process
+_pruned = False
+
+
+def cache_disabled():
+    return os.environ.get("RAG_CACHE_DISABLED") == "1"
+
+
+def model_name(llm):
+    """Best-effort name of the deployed model behind llm"""
+    return str(getattr(llm, "engine", None) or getattr(llm, "model", None) or "")
+
+
+def cache_key(output_cls, prompt_template_str, llm, inputs):
+    """SHA-256 hex digest identifying one program call"""
+    payload = "\x1f".join([
+        output_cls.__name__,
+        prompt_template_str,
+        model_name(llm),
+        # Settings that change the completion itself
+        str(getattr(llm, "temperature", None)),
+        str(getattr(llm, "max_tokens", None)),
+        json.dumps(inputs, sort_keys=True, default=str),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def read_entry(cache_path):
+    """Cached text at cache_path, or None if missing or expired"""
+    try:
+        if time.time() - cache_path.stat().st_mtime > CACHE_TTL_SECONDS:
+            return None
+        text = cache_path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+    # mtime records the last use, for the TTL and LRU eviction
+    os.utime(cache_path)
+    return text
+
+
+def write_entry(cache_path, text):
+    """Store text at cache_path, then prune the cache if this process hasn't yet"""
+    # Temp file + rename so concurrent steps never read a partial entry
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    prune_cache()
+
+
+def prune_cache():
+    """Delete expired entries, then the least recently used beyond CACHE_MAX_ENTRIES"""
+    global _pruned
+    if _pruned:
+        return
+    _pruned = True
+
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith((".json", ".txt")):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+
+    entries.sort(reverse=True)
+    now = time.time()
+    for i, (mtime, path) in enumerate(entries):
+        if i >= CACHE_MAX_ENTRIES or now - mtime > CACHE_TTL_SECONDS:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def build_program(output_cls, prompt_template_str, llm):
+    return LLMTextCompletionProgram.from_defaults(
+        output_cls=output_cls,
+        llm=llm,
+        prompt_template_str=prompt_template_str,
+        verbose=False
+    )
+
+
+def get_program(output_cls, prompt_template_str, llm):
+    """LLMTextCompletionProgram for the template, built once per process"""
+    key = (output_cls, prompt_template_str, id(llm))
+    if key not in _PROGRAMS:
+        # Keep llm alive alongside its program so its id is never reused
+        _PROGRAMS[key] = (build_program(output_cls, prompt_template_str, llm), llm)
+    return _PROGRAMS[key][0]
+
+
+def run_program(output_cls, prompt_template_str, llm, inputs):
+    """Run the program, retrying with the parse error appended to the prompt"""
+    program = get_program(output_cls, prompt_template_str, llm)
+    for attempt in range(VALIDATION_RETRIES + 1):
+        try:
+            return program(**inputs)
+        except ValueError as e:
+            # Malformed output: pydantic's ValidationError and llama_index's
+            # JSON extraction errors are both ValueErrors; anything else propagates
+            if attempt == VALIDATION_RETRIES:
+                raise
+            print(f"Output did not parse ({type(e).__name__}), retrying with feedback...")
+            # Braces are escaped so the error text survives template formatting
+            error = str(e)[:MAX_FEEDBACK_CHARS].replace("{", "{{").replace("}", "}}")
+            program = build_program(output_cls, prompt_template_str + RETRY_FEEDBACK.format(error=error), llm)
+            time.sleep(RETRY_BACKOFF_SECONDS * (attempt + 1))
+
+
+def run_cached_program(output_cls, prompt_template_str, llm, **inputs):
+    """Run an LLMTextCompletionProgram, served from disk for repeated inputs"""
+    if not cache_disabled():
+        cache_path = CACHE_DIR / f"{cache_key(output_cls, prompt_template_str, llm, inputs)}.json"
+        cached = read_entry(cache_path)
+        if cached is not None:
+            return output_cls.model_validate_json(cached)
+
+    result = run_program(output_cls, prompt_template_str, llm, inputs)
+
+    if not cache_disabled():
+        write_entry(cache_path, result.model_dump_json())
+
+    return result
+
+
+def stream_cached_completion(prompt_template_str, llm, **inputs):
+    """Yield a free-text completion as it arrives, served whole from disk for repeated inputs"""
+    if not cache_disabled():
+        cache_path = CACHE_DIR / f"{cache_key(str, prompt_template_str, llm, inputs)}.txt"
+        cached = read_entry(cache_path)
+        if cached is not None:
+            yield cached
+            return
+
+    prompt = PromptTemplate(prompt_template_str).format(**inputs)
+    parts = []
+    for response in llm.stream_complete(prompt):
+        if response.delta:
+            parts.append(response.delta)
+            yield response.delta
+
+    if not cache_disabled():
+        write_entry(cache_path, "".join(parts))
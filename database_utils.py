@@ -28,6 +28,37 @@ CRIME_CATEGORIES = [
     "human_trafficking"
 ]
 
+# Entities looked up per query in save_to_database (below SQLite's 999-variable limit)
+ENTITY_QUERY_CHUNK = 500
+
+
+def _unescape_legacy_quotes(conn_sqlite, conn_duckdb, table_name):
+    """
+    One-time fix for rows written before values were bound as parameters
+
+    Those rows stored every ' as '' in entity, summary and comments, so they
+    never matched the raw names looked up in save_to_database. Applied runs
+    are recorded per table in the SQLite schema_migrations table.
+    """
+    migration = f"unescape_quotes:{table_name}"
+    conn_sqlite.execute("CREATE TABLE IF NOT EXISTS schema_migrations (name TEXT PRIMARY KEY)")
+    if conn_sqlite.execute("SELECT 1 FROM schema_migrations WHERE name = ?", (migration,)).fetchone():
+        return
+
+    update = f"""
+    UPDATE {table_name} SET
+        entity = REPLACE(entity, $doubled, $single),
+        summary = REPLACE(summary, $doubled, $single),
+        comments = REPLACE(comments, $doubled, $single)
+    WHERE entity LIKE $pattern OR summary LIKE $pattern OR comments LIKE $pattern
+    """
+    params = {"doubled": "''", "single": "'", "pattern": "%''%"}
+    conn_duckdb.execute(update, params)
+    conn_duckdb.commit()
+    with conn_sqlite:
+        conn_sqlite.execute(update, params)
+        conn_sqlite.execute("INSERT INTO schema_migrations (name) VALUES (?)", (migration,))
+
 
 def save_to_database(df, table_name, session_id, sqlite_db_path, duckdb_db_path):
     """
@@ -44,6 +75,10 @@ def save_to_database(df, table_name, session_id, sqlite_db_path, duckdb_db_path)
     try:
         # Connect to databases
         conn_sqlite = sqlite3.connect(sqlite_db_path)
+        # WAL with NORMAL sync: one fsync per checkpoint instead of per commit
+        conn_sqlite.execute("PRAGMA journal_mode=WAL")
+        conn_sqlite.execute("PRAGMA synchronous=NORMAL")
+        conn_sqlite.execute("PRAGMA temp_store=MEMORY")
         conn_duckdb = duckdb.connect(str(duckdb_db_path))
 
         # Create table schema with crime categories as boolean columns
@@ -82,42 +117,57 @@ def save_to_database(df, table_name, session_id, sqlite_db_path, duckdb_db_path)
 
         conn_sqlite.execute(create_table_sqlite)
         conn_duckdb.execute(create_table_duckdb)
+        _unescape_legacy_quotes(conn_sqlite, conn_duckdb, table_name)
 
         # Prepare column names for insert
         column_names = ['entity', 'summary'] + [f'"{crime}"' for crime in CRIME_CATEGORIES] + ['timestamp', 'comments', 'flagged', 'session_id']
         num_columns = len(column_names)
 
+        def column(name, default):
+            return df[name].tolist() if name in df.columns else [default] * len(df)
+
+        # Latest stored crime flags and comments for the entities being saved,
+        # one query per ENTITY_QUERY_CHUNK entities (SQLite's variable limit)
+        entity_keys = list({str(entity) for entity in column('entity', '')})
+        crime_select = ", ".join(f'"{crime}"' for crime in CRIME_CATEGORIES)
+        last_entries = {}
+        for start in range(0, len(entity_keys), ENTITY_QUERY_CHUNK):
+            chunk = entity_keys[start:start + ENTITY_QUERY_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            query = f"""
+            SELECT entity, {crime_select}, comments FROM {table_name}
+            WHERE (entity, timestamp) IN (
+                SELECT entity, MAX(timestamp) FROM {table_name}
+                WHERE entity IN ({placeholders}) GROUP BY entity
+            )
+            """
+            for row in conn_sqlite.execute(query, chunk):
+                last_entries[row[0]] = (tuple(row[1:1+len(CRIME_CATEGORIES)]), row[-1])
+
         # Prepare data for insertion
         insert_data = []
         current_timestamp = datetime.now().isoformat()
 
-        for _, row in df.iterrows():
-            entity = str(row.get('entity', '')).replace("'", "''")
-            summary = str(row.get('summary', '')).replace("'", "''")
-            comments = str(row.get('comments', '')).replace("'", "''")
-            flagged = bool(row.get('flagged', False))
+        crime_flag_columns = [column(crime, False) for crime in CRIME_CATEGORIES]
+        rows = zip(
+            column('entity', ''), column('summary', ''), column('comments', ''),
+            column('flagged', False), zip(*crime_flag_columns)
+        )
 
-            # Get crime flags (default to False if not present)
-            crime_flags = tuple(
-                bool(row.get(crime, False)) for crime in CRIME_CATEGORIES
-            )
+        for entity, summary, comments, flagged, crime_values in rows:
+            # Bound as ? parameters below, so stored as-is
+            entity = str(entity)
+            summary = str(summary)
+            comments = str(comments)
+            flagged = bool(flagged)
 
-            # Check if this entity already exists with same data
-            query = f"SELECT * FROM {table_name} WHERE entity = ? ORDER BY timestamp DESC LIMIT 1"
-            last_entry_sqlite = conn_sqlite.execute(query, (entity,)).fetchone()
+            # Get crime flags (default to False if not present)
+            crime_flags = tuple(bool(value) for value in crime_values)
 
             # Only insert if data has changed or doesn't exist
-            should_insert = False
-            if not last_entry_sqlite:
-                should_insert = True
-            else:
-                # Compare crime flags and comments (skip entity, summary, timestamp, session_id)
-                last_crimes = last_entry_sqlite[2:2+len(CRIME_CATEGORIES)]
-                last_comments = last_entry_sqlite[-3]
-                if last_crimes != crime_flags or last_comments != comments:
-                    should_insert = True
-
-            if should_insert:
+            # (compare crime flags and comments; skip summary, timestamp, session_id)
+            last_entry = last_entries.get(entity)
+            if last_entry is None or last_entry != (crime_flags, comments):
                 data_row = tuple([entity, summary] + list(crime_flags) + [current_timestamp, comments, flagged, session_id])
                 insert_data.append(data_row)
 
@@ -125,10 +175,20 @@ def save_to_database(df, table_name, session_id, sqlite_db_path, duckdb_db_path)
         if insert_data:
             placeholders = ', '.join(['?'] * num_columns)
             query = f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES ({placeholders})"
-            conn_sqlite.executemany(query, insert_data)
-            conn_duckdb.executemany(query, insert_data)
+            # One transaction for the whole batch, committed on exit
+            with conn_sqlite:
+                conn_sqlite.executemany(query, insert_data)
+
+            # DuckDB ingests the rows as one columnar DataFrame scan
+            new_rows = pd.DataFrame(insert_data, columns=[name.strip('"') for name in column_names])
+            select_columns = ", ".join(
+                "CAST(timestamp AS TIMESTAMP)" if name == "timestamp" else name
+                for name in column_names
+            )
+            conn_duckdb.register("new_rows", new_rows)
+            conn_duckdb.execute(f"INSERT INTO {table_name} ({', '.join(column_names)}) SELECT {select_columns} FROM new_rows")
+            conn_duckdb.unregister("new_rows")
 
-            conn_sqlite.commit()
             conn_duckdb.commit()
 
             return True, f"Successfully saved {len(insert_data)} entities to database"
@@ -156,13 +216,6 @@ def create_dataframe_from_results(entities_dict, risk_assessment, comments_dict=
         DataFrame ready for database saving
     """
 
-    # Initialize data structure
-    data = {'entity': [], 'summary': [], 'comments': [], 'flagged': []}
-
-    # Add crime category columns
-    for crime in CRIME_CATEGORIES:
-        data[crime] = []
-
     # Build a mapping of entities to their crimes
     entity_crimes = {}
     for flagged_entity in risk_assessment.get('flagged_entities', []):
@@ -170,17 +223,20 @@ def create_dataframe_from_results(entities_dict, risk_assessment, comments_dict=
         crimes = flagged_entity['crimes_flagged']
         entity_crimes[entity_name] = set(crimes)
 
-    # Process each entity
-    for entity_name, description in entities_dict.items():
-        data['entity'].append(entity_name)
-        data['summary'].append(description)
-        data['comments'].append(comments_dict.get(entity_name, '') if comments_dict else '')
-        data['flagged'].append(entity_name in entity_crimes)
-
-        # Set crime flags
-        entity_crime_set = entity_crimes.get(entity_name, set())
-        for crime in CRIME_CATEGORIES:
-            data[crime].append(crime in entity_crime_set)
+    # Build each column in one pass over the entities
+    names = list(entities_dict)
+    comments_dict = comments_dict or {}
+    crime_sets = [entity_crimes.get(name, ()) for name in names]
+    data = {
+        'entity': names,
+        'summary': list(entities_dict.values()),
+        'comments': [comments_dict.get(name, '') for name in names],
+        'flagged': [name in entity_crimes for name in names],
+    }
+
+    # Set crime flags
+    for crime in CRIME_CATEGORIES:
+        data[crime] = [crime in crime_set for crime_set in crime_sets]
 
     return pd.DataFrame(data)
 
@@ -205,7 +261,9 @@ def get_entity_history(entity_name, table_name, duckdb_db_path):
         WHERE entity = ?
         ORDER BY timestamp DESC
         """
-        result = conn.execute(query, (entity_name,)).fetchdf()
+        # Arrow-backed columns avoid converting every value to a Python object
+        table = conn.execute(query, (entity_name,)).arrow()
+        result = table.to_pandas(types_mapper=pd.ArrowDtype)
         conn.close()
         return result
 
@@ -0,0 +1,37 @@
+"""
+JSON Utility Functions for the Pipeline Steps
+Read and write the JSON files passed between steps and shown in the app
+
+orjson is optional: without it the standard library json module is used.
+Files are always UTF-8; orjson writes non-ASCII characters unescaped.
+"""
+import json
+
+# orjson is optional - falls back to json if not installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def read_json(path):
+    """Parse the JSON file at path"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_json(data):
+    """Serialize data as indented JSON text"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, indent=2)
+
+
+def write_json(path, data):
+    """Write data as indented JSON to path"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps_json(data))
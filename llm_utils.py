@@ -0,0 +1,50 @@
+"""
+LLM Utility Functions for the Pipeline Steps
+Shared Azure OpenAI client construction
+
+Every LLM a step builds shares one Azure AD credential and one pooled HTTP
+client, so concurrent calls reuse keep-alive connections instead of paying
+a TCP + TLS handshake each. With the h2 package installed the client speaks
+HTTP/2 and multiplexes concurrent calls over those connections.
+"""
+from functools import lru_cache
+
+import httpx
+from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from llama_index.llms.azure_openai import AzureOpenAI
+
+# h2 is optional - httpx falls back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@lru_cache(maxsize=1)
+def get_http_client():
+    """Process-wide pooled HTTP client for Azure OpenAI calls"""
+    return httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+    )
+
+
+@lru_cache(maxsize=1)
+def get_token_provider():
+    """Process-wide Azure AD bearer token provider"""
+    return get_bearer_token_provider(
+        DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
+    )
+
+
+@lru_cache(maxsize=None)
+def build_llm(engine, max_tokens=None):
+    """Azure OpenAI LLM for the given deployment, built once per process"""
+    return AzureOpenAI(
+        engine=engine,
+        max_tokens=max_tokens,
+        http_client=get_http_client(),
+        use_azure_ad=True,
+        azure_ad_token_provider=get_token_provider()
+    )
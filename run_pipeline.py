@@ -12,19 +12,64 @@ This script runs all 6 steps automatically:
 6. Extract relationships and create knowledge graph
 
 Use --skip-grouping to skip step 4 (entity grouping)
+
+A step is skipped when its script, arguments and input files are byte-identical
+to its last successful run in the output folder and its outputs still exist.
+Set RAG_CACHE_DISABLED=1 to always run every step.
 """
 
+import hashlib
+import os
 import sys
 import subprocess
 from pathlib import Path
+from json_utils import read_json, write_json
+
+# Hashes of the last successful run of each step, kept in the output folder
+STAGE_CACHE_FILE = ".stage_cache.json"
+
+# Environment settings that change a step's output
+STAGE_ENV_VARS = ("MODEL_TIER",)
+
+# Shared modules every step imports; editing one reruns all steps
+STAGE_SHARED_MODULES = ("cache_utils.py", "llm_utils.py", "token_utils.py", "json_utils.py")
+
 
+def stage_key(script_name, args, input_paths):
+    """SHA-256 of the step script and shared modules, its arguments and the content of its inputs"""
+    digest = hashlib.sha256()
+    parts = [Path(script_name), *map(Path, STAGE_SHARED_MODULES), *input_paths]
+    for part in parts:
+        digest.update(f"{part}\x1f".encode("utf-8"))
+        if part.exists():
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        digest.update(f"\x1f{part.exists()}\x1e".encode("utf-8"))
+    for value in [*args, *(os.environ.get(name, "") for name in STAGE_ENV_VARS)]:
+        digest.update(f"{value}\x1e".encode("utf-8"))
+    return digest.hexdigest()
 
-def run_step(script_name, args):
-    """Run a step script"""
+
+def run_step(script_name, args, output_folder, inputs=(), outputs=()):
+    """Run a step script, unless its inputs are unchanged since its last run"""
     print(f"\n{'='*60}")
     print(f"Running {script_name}...")
     print(f"{'='*60}\n")
 
+    cache_path = output_folder / STAGE_CACHE_FILE
+    use_cache = os.environ.get("RAG_CACHE_DISABLED") != "1"
+    stage_cache = read_json(cache_path) if use_cache and cache_path.exists() else {}
+    key = stage_key(script_name, args, [Path(path) for path in inputs])
+
+    if (
+        use_cache
+        and stage_cache.get(script_name) == key
+        and all((output_folder / name).exists() for name in outputs)
+    ):
+        print(f"✓ {script_name} inputs unchanged, reusing its outputs")
+        return
+
     cmd = ["python", script_name] + args
     result = subprocess.run(cmd, capture_output=False, text=True)
 
@@ -32,6 +77,10 @@ def run_step(script_name, args):
         print(f"\n❌ Error in {script_name}")
         sys.exit(1)
 
+    if use_cache:
+        stage_cache[script_name] = key
+        write_json(cache_path, stage_cache)
+
     print(f"\n✓ {script_name} completed successfully")
 
 
@@ -91,16 +140,28 @@ def main():
 
     print("="*60)
 
-    # Run all steps
-    run_step("step1_summarize.py", [input_file, str(output_folder)])
-    run_step("step2_extract_entities.py", [str(output_folder)])
-    run_step("step3_describe_entities.py", [str(output_folder)])
+    # Run all steps (inputs and outputs decide whether a step can be skipped)
+    text_file = output_folder / "extracted_text.txt"
+    entities_file = output_folder / "entities.json"
+    descriptions_file = output_folder / "entity_descriptions.json"
+    grouped_file = output_folder / "dict_unique_grouped_entity_summary.json"
+    risk_file = output_folder / "risk_assessment.json"
+
+    run_step("step1_summarize.py", [input_file, str(output_folder)], output_folder,
+             [input_file], ["extracted_text.txt", f"summary_{Path(input_file).stem}.json"])
+    run_step("step2_extract_entities.py", [str(output_folder)], output_folder,
+             [text_file], ["entities.json"])
+    run_step("step3_describe_entities.py", [str(output_folder)], output_folder,
+             [text_file, entities_file], ["entity_descriptions.json"])
 
     if not skip_grouping:
-        run_step("step4_group_entities.py", [str(output_folder)])
+        run_step("step4_group_entities.py", [str(output_folder)], output_folder,
+                 [descriptions_file], ["dict_unique_grouped_entity_summary.json"])
 
-    run_step("step5_analyze_risks.py", [str(output_folder)])
-    run_step("step6_extract_relationships.py", [str(output_folder)])
+    run_step("step5_analyze_risks.py", [str(output_folder)], output_folder,
+             [descriptions_file, grouped_file], ["risk_assessment.json"])
+    run_step("step6_extract_relationships.py", [str(output_folder)], output_folder,
+             [descriptions_file, grouped_file, risk_file], ["entity_relationships.json", "graph_elements.json"])
 
     # Show final results
     print("\n" + "="*60)
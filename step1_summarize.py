@@ -6,16 +6,27 @@ Usage: python step1_summarize.py <input_file.pdf>
 Output: Creates summary.json with the document summary
 """
 
+import hashlib
+import io
+import os
 import sys
-import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from pydantic import BaseModel, Field
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.azure_openai import AzureOpenAI
+from json_utils import read_json, write_json
+from cache_utils import CACHE_DIR, cache_disabled, read_entry, stream_cached_completion, write_entry
+from llm_utils import build_llm
+from token_utils import CHARS_PER_TOKEN, MAX_CHARS_PER_TOKEN, TIKTOKEN_AVAILABLE, truncate_to_tokens
 from docx import Document
 import PyPDF2
 
+# PDFium text extraction (optional - falls back to PyPDF2 if not installed)
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
 # OCR imports (optional - will work without OCR if not installed)
 try:
     from pdf2image import convert_from_path
@@ -26,21 +37,26 @@ except ImportError:
     print("Note: OCR not available. Install with: pip install pdf2image pytesseract")
 
 
+def docx_row_text(row):
+    """Cell texts of a table row joined with " | " """
+    # Merged cells repeat the same underlying <w:tc> across the span; read
+    # each one's text once
+    cell_texts = {}
+    parts = []
+    for cell in row.cells:
+        if cell._tc not in cell_texts:
+            cell_texts[cell._tc] = cell.text.strip()
+        parts.append(cell_texts[cell._tc])
+    return " | ".join(parts)
+
+
 def extract_text_from_docx(file_path):
     """Extract text from DOCX file"""
     doc = Document(file_path)
-    text_parts = []
-
-    for paragraph in doc.paragraphs:
-        if paragraph.text.strip():
-            text_parts.append(paragraph.text)
-
-    for table in doc.tables:
-        for row in table.rows:
-            row_text = [cell.text.strip() for cell in row.cells]
-            text_parts.append(" | ".join(row_text))
 
-    return "\n".join(text_parts)
+    paragraphs = (paragraph.text for paragraph in doc.paragraphs)
+    rows = (docx_row_text(row) for table in doc.tables for row in table.rows)
+    return "\n".join(chain((text for text in paragraphs if text.strip()), rows))
 
 
 def ocr_pdf_page(pdf_path, page_num):
@@ -87,30 +103,124 @@ def ocr_entire_pdf(pdf_path):
         return ""
 
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF file (with OCR fallback for scanned PDFs)"""
-    text_parts = []
+# Nesting depth of Form XObjects searched for fonts (also stops reference cycles)
+MAX_FORM_DEPTH = 8
 
-    with open(file_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
 
-        for page_num, page in enumerate(pdf_reader.pages):
-            text = page.extract_text()
+def resources_have_fonts(resources, depth=0):
+    """True if resources, or a Form XObject nested in them, declares a /Font"""
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if "/Font" in resources:
+        return True
 
-            if text and text.strip():
-                text_parts.append(text)
-            elif OCR_AVAILABLE:
-                print(f"Using OCR for page {page_num + 1}...")
-                ocr_text = ocr_pdf_page(file_path, page_num)
-                if ocr_text:
-                    text_parts.append(ocr_text)
+    xobjects = resources.get("/XObject")
+    if xobjects is None or depth >= MAX_FORM_DEPTH:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Form" and resources_have_fonts(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def page_has_text_layer(page):
+    """Cheap check for vector text: a page with no /Font resources, on the page
+    or in its Form XObjects, is image-only"""
+    return resources_have_fonts(page.get("/Resources"))
+
+
+# Below this many pages, process pool start-up costs more than it saves
+PARALLEL_MIN_PAGES = 3
+
+# Page-extraction processes per run; callers starting several step 1 runs at
+# once lower it with STEP1_PDF_WORKERS or --pdf-workers=N (1 = serial)
+PDF_WORKERS = int(os.environ.get("STEP1_PDF_WORKERS", 0)) or os.cpu_count() or 1
+
+# Tokens of document text sent per summary call (about the former 15000 characters)
+DOCUMENT_TOKEN_BUDGET = 3750
+
+# Output cap for the summary calls: 5-8 short bullets
+MAX_OUTPUT_TOKENS = 400
+
+# truncate_to_tokens never looks past this many characters of realistic text, so
+# once this much is extracted the summary can start while later pages extract
+EARLY_SUMMARY_CHARS = DOCUMENT_TOKEN_BUDGET * (MAX_CHARS_PER_TOKEN if TIKTOKEN_AVAILABLE else CHARS_PER_TOKEN)
+
+
+def extract_pdfium_pages(args):
+    """Text layer of pages [start, stop) of a PDF, opened fresh in a worker process"""
+    file_path, start, stop = args
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        texts = []
+        for page_index in range(start, stop):
+            page = pdf[page_index]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return texts
+    finally:
+        pdf.close()
+
+
+def extract_page_texts(file_path, pdf_bytes):
+    """Yield the text layer of each page in order ("" for image-only pages)"""
+    if PDFIUM_AVAILABLE:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        n_pages = len(pdf)
+        pdf.close()
+
+        workers = min(PDF_WORKERS, n_pages)
+        if n_pages < PARALLEL_MIN_PAGES or workers < 2:
+            yield from extract_pdfium_pages((file_path, 0, n_pages))
+            return
+
+        # Pages decode independently; give each worker one contiguous range so
+        # every process parses the document structure only once
+        bounds = [n_pages * i // workers for i in range(workers + 1)]
+        ranges = [(file_path, bounds[i], bounds[i + 1]) for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in executor.map(extract_pdfium_pages, ranges):
+                yield from chunk
+        return
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    # Scanned pages carry no fonts; skip decompressing their image streams
+    for page in pdf_reader.pages:
+        yield page.extract_text() if page_has_text_layer(page) else ""
+
+
+def iter_pdf_text(file_path):
+    """Yield the text of each PDF page as it is extracted (with OCR fallback for scanned PDFs)"""
+    found_text = False
+
+    # One sequential read; the parser then resolves the xref table from memory
+    with open(file_path, 'rb') as file:
+        pdf_bytes = file.read()
+
+    for page_num, text in enumerate(extract_page_texts(file_path, pdf_bytes)):
+        if text and text.strip():
+            found_text = True
+            yield text
+        elif OCR_AVAILABLE:
+            print(f"Using OCR for page {page_num + 1}...")
+            ocr_text = ocr_pdf_page(file_path, page_num)
+            if ocr_text:
+                found_text = True
+                yield ocr_text
 
     # If no text extracted and OCR is available, try full OCR
-    if not text_parts and OCR_AVAILABLE:
+    if not found_text and OCR_AVAILABLE:
         print("No text found. Running full OCR on entire PDF...")
-        text_parts.append(ocr_entire_pdf(file_path))
+        yield ocr_entire_pdf(file_path)
 
-    return "\n\n".join(text_parts)
+
+def extract_text_from_pdf(file_path):
+    """Extract text from PDF file (with OCR fallback for scanned PDFs)"""
+    return "\n\n".join(iter_pdf_text(file_path))
 
 
 def extract_text(file_path):
@@ -126,51 +236,108 @@ def extract_text(file_path):
         return None
 
 
-# Pydantic model
-class DocumentSummary(BaseModel):
-    summary: str = Field(description="Comprehensive summary of the document")
+def extract_text_parts(file_path):
+    """Yield the text of file_path in order: page by page for a PDF, whole otherwise"""
+    if Path(file_path).suffix.lower() == '.pdf':
+        yield from iter_pdf_text(file_path)
+        return
 
+    text = extract_text(file_path)
+    if text:
+        yield text
 
-def summarize_document(text, llm):
-    """Generate summary using LlamaIndex"""
 
-    # Limit text to 15000 characters
-    text_to_summarize = text[:15000]
+def cached_extract_text_parts(file_path):
+    """extract_text_parts(file_path), served whole from the step cache for a file seen before"""
+    if cache_disabled():
+        yield from extract_text_parts(file_path)
+        return
+
+    # Keyed by file content and by which extractors are installed (they differ in output)
+    digest = hashlib.sha256()
+    digest.update(f"{Path(file_path).suffix.lower()}|pdfium={PDFIUM_AVAILABLE}|ocr={OCR_AVAILABLE}".encode("utf-8"))
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
 
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=DocumentSummary,
-        llm=llm,
-        prompt_template_str="""You are an expert document analyst. Summarize documents clearly and accurately.
+    cache_path = CACHE_DIR / f"text_{digest.hexdigest()}.txt"
+    cached = read_entry(cache_path)
+    if cached is not None:
+        print("Using cached extracted text")
+        yield cached
+        return
 
-Provide a comprehensive summary of this document.
-Include:
-- Main purpose and context
-- Key parties involved
-- Important dates and amounts
-- Critical actions or decisions
+    parts = []
+    for part in extract_text_parts(file_path):
+        parts.append(part)
+        yield part
+    if parts:
+        write_entry(cache_path, "\n\n".join(parts))
 
-Document:
+
+# Summaries are mirrored here as they stream in (--stream-summary), for the app to display
+SUMMARY_STREAM_FILE = "summary_stream.txt"
+
+
+def generate_summary(prompt_template_str, llm, stream_path=None, **inputs):
+    """Stream a free-text summary, mirroring it into stream_path as it arrives"""
+    parts = []
+    stream_file = open(stream_path, "w", encoding="utf-8") if stream_path else None
+    try:
+        for delta in stream_cached_completion(prompt_template_str, llm, **inputs):
+            parts.append(delta)
+            if stream_file:
+                stream_file.write(delta)
+                stream_file.flush()
+    finally:
+        if stream_file:
+            stream_file.close()
+    return "".join(parts).strip()
+
+
+# Prompt for a single document summary
+SUMMARY_PROMPT = """Document:
 {document_text}
-""",
-        verbose=False
+
+Summarize the document above: purpose and context, key parties, important dates and amounts, critical actions or decisions.
+At most 5 bullets of 25 words or fewer. No preamble, no closing remarks.
+"""
+
+
+def summarize_document(text, llm, stream_path=None):
+    """Generate summary using LlamaIndex"""
+
+    # Limit text to the document token budget
+    text_to_summarize = truncate_to_tokens(text, DOCUMENT_TOKEN_BUDGET, llm.engine)
+
+    return generate_summary(
+        SUMMARY_PROMPT,
+        llm,
+        stream_path,
+        document_text=text_to_summarize
     )
 
-    result = program(document_text=text_to_summarize)
-    return result.summary
+
+# Prompt for the summary across all uploaded documents
+COMBINED_SUMMARY_PROMPT = """Document summaries:
+{all_summaries}
+
+Combine the summaries above into one: common themes, shared people and organizations, related events or transactions, overlapping time periods, key differences.
+At most 8 bullets of 25 words or fewer. No preamble, no closing remarks.
+"""
 
 
-def create_combined_summary(output_folder, summary_files, llm):
+def create_combined_summary(output_folder, summary_files, llm, stream_path=None):
     """Create a combined summary from multiple document summaries"""
 
     # Read all summaries
     summaries_data = []
     for summary_file in summary_files:
-        with open(summary_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            summaries_data.append({
-                "file_name": data.get("file_name", "Unknown"),
-                "summary": data.get("summary", "")
-            })
+        data = read_json(summary_file)
+        summaries_data.append({
+            "file_name": data.get("file_name", "Unknown"),
+            "summary": data.get("summary", "")
+        })
 
     # Combine summaries into a single text
     combined_text = ""
@@ -179,30 +346,16 @@ def create_combined_summary(output_folder, summary_files, llm):
         combined_text += data['summary']
         combined_text += "\n"
 
-    # Limit combined text to 15000 characters
-    combined_text = combined_text[:15000]
+    # Limit combined text to the document token budget
+    combined_text = truncate_to_tokens(combined_text, DOCUMENT_TOKEN_BUDGET, llm.engine)
 
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=DocumentSummary,
-        llm=llm,
-        prompt_template_str="""You are an expert document analyst. Analyze multiple document summaries and create a combined summary.
-
-Identify and highlight:
-- Common themes across all documents
-- Shared entities (people, organizations)
-- Related events or transactions
-- Overlapping time periods
-- Key differences between documents
-
-Document Summaries:
-{all_summaries}
-""",
-        verbose=False
+    combined_summary = generate_summary(
+        COMBINED_SUMMARY_PROMPT,
+        llm,
+        stream_path,
+        all_summaries=combined_text
     )
 
-    result = program(all_summaries=combined_text)
-    combined_summary = result.summary
-
     # Save combined summary
     combined_result = {
         "file_count": len(summaries_data),
@@ -210,29 +363,71 @@ Document Summaries:
         "combined_summary": combined_summary
     }
 
-    with open(output_folder / "combined_summary.json", "w", encoding="utf-8") as f:
-        json.dump(combined_result, f, indent=2)
+    write_json(output_folder / "combined_summary.json", combined_result)
 
     print(f"Saved: {output_folder}/combined_summary.json")
     print(f"Combined {len(summaries_data)} document summaries")
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python step1_summarize.py <input_file.pdf> [output_folder]")
+    # --skip-combined-summary: leave combined_summary.json to a later run
+    # --skip-extracted-text: don't write extracted_text.txt (another run owns it)
+    # --combined-summary-only <output_folder>: only combine the existing summaries
+    # --stream-summary: mirror summaries into SUMMARY_STREAM_FILE while they generate
+    # --pdf-workers=N: extract PDF pages with at most N processes
+    global PDF_WORKERS
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    skip_combined = "--skip-combined-summary" in flags
+    for flag in flags:
+        if flag.startswith("--pdf-workers="):
+            PDF_WORKERS = max(1, int(flag.split("=", 1)[1]))
+
+    if len(args) < 1:
+        print("Usage: python step1_summarize.py <input_file.pdf> [output_folder] [--skip-combined-summary] [--skip-extracted-text] [--stream-summary] [--pdf-workers=N]")
+        print("       python step1_summarize.py --combined-summary-only <output_folder> [--stream-summary]")
         sys.exit(1)
 
-    input_file = sys.argv[1]
-    output_folder = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(".")
+    if "--combined-summary-only" in flags:
+        output_folder = Path(args[0])
+        stream_path = output_folder / SUMMARY_STREAM_FILE if "--stream-summary" in flags else None
+        summary_files = sorted(output_folder.glob("summary_*.json"))
+        print(f"\n=== STEP 1: COMBINED SUMMARY ===")
+        if len(summary_files) > 1:
+            print(f"Found {len(summary_files)} summary files. Creating combined summary...")
+            create_combined_summary(output_folder, summary_files, build_llm("gpt-4o-mini", max_tokens=MAX_OUTPUT_TOKENS), stream_path)
+        if stream_path:
+            stream_path.unlink(missing_ok=True)
+        print("\n=== STEP 1 COMPLETE ===\n")
+        return
+
+    input_file = args[0]
+    output_folder = Path(args[1]) if len(args) > 1 else Path(".")
     output_folder.mkdir(parents=True, exist_ok=True)
+    stream_path = output_folder / SUMMARY_STREAM_FILE if "--stream-summary" in flags else None
 
     print(f"\n=== STEP 1: SUMMARIZE DOCUMENT ===")
     print(f"Processing: {input_file}")
     print(f"Output folder: {output_folder}")
 
-    # Extract text
+    # Initialize Azure OpenAI LLM
+    llm = build_llm("gpt-4o-mini", max_tokens=MAX_OUTPUT_TOKENS)
+
+    # Extract text, starting the summary as soon as enough pages are in;
+    # a prefix of EARLY_SUMMARY_CHARS truncates to the same summary input
     print("Extracting text...")
-    text = extract_text(input_file)
+    summary_executor = ThreadPoolExecutor(max_workers=1)
+    early_summary = None
+    text_parts = []
+    extracted_chars = 0
+    for part in cached_extract_text_parts(input_file):
+        # Length of "\n\n".join(text_parts)
+        extracted_chars += len(part) + (2 if text_parts else 0)
+        text_parts.append(part)
+        if early_summary is None and extracted_chars >= EARLY_SUMMARY_CHARS:
+            print("Generating summary while the remaining pages extract...")
+            early_summary = summary_executor.submit(summarize_document, "\n\n".join(text_parts), llm, stream_path)
+    text = "\n\n".join(text_parts)
 
     if not text:
         print("Failed to extract text")
@@ -240,23 +435,21 @@ def main():
 
     print(f"Extracted {len(text)} characters")
 
-    # Save extracted text
-    with open(output_folder / "extracted_text.txt", "w", encoding="utf-8") as f:
-        f.write(text)
-    print(f"Saved: {output_folder}/extracted_text.txt")
-
-    # Initialize Azure OpenAI LLM
-    llm = AzureOpenAI(
-        engine="gpt-4o-mini",
-        use_azure_ad=True,
-        azure_ad_token_provider=get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-        )
-    )
-
-    # Generate summary
-    print("Generating summary...")
-    summary = summarize_document(text, llm)
+    # Save extracted text (temp file + rename: the app starts step 2 as soon as it appears)
+    if "--skip-extracted-text" not in flags:
+        tmp_path = output_folder / "extracted_text.txt.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, output_folder / "extracted_text.txt")
+        print(f"Saved: {output_folder}/extracted_text.txt")
+
+    # Generate summary (or collect the one started during extraction)
+    if early_summary is None:
+        print("Generating summary...")
+        summary = summarize_document(text, llm, stream_path)
+    else:
+        summary = early_summary.result()
+    summary_executor.shutdown()
 
     # Save summary with filename
     input_filename = Path(input_file).stem  # Get filename without extension
@@ -266,17 +459,19 @@ def main():
     }
 
     summary_filename = f"summary_{input_filename}.json"
-    with open(output_folder / summary_filename, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2)
+    write_json(output_folder / summary_filename, result)
 
     print(f"Saved: {output_folder}/{summary_filename}")
     print(f"\nSummary:\n{summary}")
 
     # Check if there are multiple summary files and create a combined summary
-    summary_files = list(output_folder.glob("summary_*.json"))
-    if len(summary_files) > 1:
+    summary_files = sorted(output_folder.glob("summary_*.json"))
+    if len(summary_files) > 1 and not skip_combined:
         print(f"\nFound {len(summary_files)} summary files. Creating combined summary...")
-        create_combined_summary(output_folder, summary_files, llm)
+        create_combined_summary(output_folder, summary_files, llm, stream_path)
+
+    if stream_path:
+        stream_path.unlink(missing_ok=True)
 
     print("\n=== STEP 1 COMPLETE ===\n")
 
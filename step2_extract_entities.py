@@ -6,14 +6,22 @@ Reads: extracted_text.txt (from step 1)
 Output: Creates entities.json with list of persons and companies
 """
 
-import json
+import os
 import sys
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.azure_openai import AzureOpenAI
+from json_utils import write_json
+from cache_utils import run_cached_program
+from llm_utils import build_llm
+from token_utils import truncate_to_tokens
+
+
+# MODEL_TIER=full restores gpt-4o; the default mini tier is enough for structured extraction
+MODEL_TIER = os.environ.get("MODEL_TIER", "mini")
+
+# Tokens of document text sent for extraction (about the former 15000 characters)
+DOCUMENT_TOKEN_BUDGET = 3750
 
 
 # Pydantic model
@@ -22,31 +30,25 @@ class Entities(BaseModel):
     companies: List[str] = Field(description="List of company/organization names found in the document")
 
 
-def extract_entities(text, llm):
-    """Extract persons and companies using LlamaIndex"""
+EXTRACTION_PROMPT = """Document:
+{document_text}
 
-    # Limit text to 15000 characters
-    text_to_analyze = text[:15000]
+Extract every person (full name, e.g. "Dr. Jane Doe") and company/organization/institution (e.g. "Ministry of Finance") in the document above.
+"""
 
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=Entities,
-        llm=llm,
-        prompt_template_str="""You are an expert at extracting entities from documents.
 
-Extract all persons and companies from this document.
+def extract_entities(text, llm):
+    """Extract persons and companies using LlamaIndex"""
 
-Guidelines:
-- Persons: Full names of individuals (e.g., "John Smith", "Dr. Jane Doe")
-- Companies: Company names, organizations, institutions (e.g., "ABC Corporation", "Ministry of Finance")
-- Be thorough - extract all entities mentioned
+    # Limit text to the document token budget
+    text_to_analyze = truncate_to_tokens(text, DOCUMENT_TOKEN_BUDGET, llm.engine)
 
-Document:
-{document_text}
-""",
-        verbose=False
+    result = run_cached_program(
+        Entities,
+        EXTRACTION_PROMPT,
+        llm,
+        document_text=text_to_analyze
     )
-
-    result = program(document_text=text_to_analyze)
     return result
 
 
@@ -71,13 +73,7 @@ def main():
         sys.exit(1)
 
     # Initialize Azure OpenAI LLM
-    llm = AzureOpenAI(
-        engine="gpt-4o",
-        use_azure_ad=True,
-        azure_ad_token_provider=get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-        )
-    )
+    llm = build_llm("gpt-4o" if MODEL_TIER == "full" else "gpt-4o-mini")
 
     # Extract entities
     print("Extracting entities...")
@@ -86,8 +82,7 @@ def main():
     # Save entities
     output = result.model_dump()
 
-    with open(output_folder / "entities.json", "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2)
+    write_json(output_folder / "entities.json", output)
 
     print(f"Saved: {output_folder}/entities.json")
     print(f"\nFound {len(output['persons'])} person(s)")
@@ -6,19 +6,96 @@ Reads: extracted_text.txt, entities.json (from previous steps)
 Output: Creates entity_descriptions.json with detailed info for each entity
 """
 
-import json
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import Dict
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.azure_openai import AzureOpenAI
+from json_utils import read_json, write_json
+from cache_utils import run_cached_program
+from llm_utils import build_llm
+from token_utils import truncate_to_tokens
+
+# rapidfuzz is optional - without it only exact duplicates (after normalization) are merged
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+
+# Tokens of document text sent for descriptions (about the former 12000 characters)
+DOCUMENT_TOKEN_BUDGET = 3000
+
+# Concurrent LLM calls (entity batches are described independently)
+MAX_WORKERS = 8
+
+# Entities described per LLM call; the document text is sent once per batch
+ENTITY_BATCH_SIZE = 25
+
+# Names with the same last word whose normalized word sets are at least this
+# similar (0-100) are merged; lower scores merged "joan smith" into "john smith"
+FUZZY_DUPLICATE_SCORE = 95
+
+# Titles and legal-form suffixes ignored when comparing names
+NAME_NOISE_RE = re.compile(r"\b(mr|mrs|ms|dr|inc|ltd|corp|llc)\b\.?")
 
 
 # Pydantic model
 class EntityDescriptions(BaseModel):
-    entities: Dict[str, str] = Field(description="Dictionary mapping entity names to their descriptions")
+    entities: Dict[str, str] = Field(description="Dictionary mapping entity names to descriptions of 30 words or fewer")
+
+
+def normalize_name(name):
+    """Lowercase name without titles, legal-form suffixes or punctuation"""
+    name = NAME_NOISE_RE.sub(" ", name.lower())
+    return " ".join(re.sub(r"[^\w\s]", " ", name).split())
+
+
+def is_fuzzy_duplicate(key, other):
+    """True if two normalized names share a last word and nearly all other words"""
+    key_words, other_words = key.split(), other.split()
+    if not key_words or not other_words or key_words[-1] != other_words[-1]:
+        return False
+    return fuzz.token_set_ratio(key, other) >= FUZZY_DUPLICATE_SCORE
+
+
+def dedupe_names(names):
+    """Drop names that repeat an earlier one, keeping the first spelling
+
+    Call once per entity type so persons are never merged into companies.
+    """
+    kept = {}
+    for name in names:
+        key = normalize_name(name)
+        if key in kept:
+            continue
+        if RAPIDFUZZ_AVAILABLE and any(is_fuzzy_duplicate(key, other) for other in kept):
+            continue
+        kept[key] = name
+    return list(kept.values())
+
+
+DESCRIPTION_PROMPT = """Document:
+{document_text}
+
+Entities: {entity_names}
+
+Describe each entity in 30 words or fewer, using only the document above. No preamble.
+"""
+
+
+def select_context(paragraphs, entity_names, llm):
+    """Paragraphs mentioning any of entity_names, in document order, cut to the token budget"""
+    needles = [name.lower() for name in entity_names]
+    relevant = [
+        paragraph for paragraph, lowered in paragraphs
+        if any(needle in lowered for needle in needles)
+    ]
+    # Nothing matched verbatim (e.g. a normalized name): fall back to the document start
+    context = "\n\n".join(relevant) if relevant else "\n\n".join(paragraph for paragraph, _ in paragraphs)
+    return truncate_to_tokens(context, DOCUMENT_TOKEN_BUDGET, llm.engine)
 
 
 def describe_entities(text, persons, companies, llm):
@@ -30,26 +107,31 @@ def describe_entities(text, persons, companies, llm):
     if not all_entities:
         return {}
 
-    entity_names = ", ".join(all_entities)
-    text_to_analyze = text[:12000]
-
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=EntityDescriptions,
-        llm=llm,
-        prompt_template_str="""You are an expert analyst. Analyze entities based only on information in the document.
-
-Analyze these entities from the document: {entity_names}
-
-For each entity provide a short description based on the document.
-
-Document:
-{document_text}
-""",
-        verbose=False
-    )
+    text_to_analyze = truncate_to_tokens(text, DOCUMENT_TOKEN_BUDGET, llm.engine)
+
+    # A document over the budget is cut per batch to the paragraphs (pages for
+    # PDFs) that mention the batch's entities, rather than to its first pages
+    paragraphs = None
+    if len(text_to_analyze) < len(text):
+        paragraphs = [(paragraph, paragraph.lower()) for paragraph in text.split("\n\n") if paragraph.strip()]
+
+    def describe_batch(batch):
+        document_text = select_context(paragraphs, batch, llm) if paragraphs else text_to_analyze
+        result = run_cached_program(
+            EntityDescriptions,
+            DESCRIPTION_PROMPT,
+            llm,
+            entity_names=", ".join(batch), document_text=document_text
+        )
+        return result.entities
 
-    result = program(entity_names=entity_names, document_text=text_to_analyze)
-    return result.entities
+    # Describe entities in batches, with the batches running concurrently
+    batches = [all_entities[i:i + ENTITY_BATCH_SIZE] for i in range(0, len(all_entities), ENTITY_BATCH_SIZE)]
+    descriptions = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for batch_descriptions in executor.map(describe_batch, batches):
+            descriptions.update(batch_descriptions)
+    return descriptions
 
 
 def main():
@@ -75,31 +157,24 @@ def main():
     # Read entities
     print("Reading entities.json...")
     try:
-        with open(output_folder / "entities.json", "r", encoding="utf-8") as f:
-            entities = json.load(f)
+        entities = read_json(output_folder / "entities.json")
     except FileNotFoundError:
         print("Error: entities.json not found. Run step2_extract_entities.py first.")
         sys.exit(1)
 
-    persons = entities.get('persons', [])
-    companies = entities.get('companies', [])
+    # Persons and companies are deduplicated separately
+    persons = dedupe_names(entities.get('persons', []))
+    companies = dedupe_names(entities.get('companies', []))
 
     # Initialize Azure OpenAI LLM
-    llm = AzureOpenAI(
-        engine="gpt-4o-mini",
-        use_azure_ad=True,
-        azure_ad_token_provider=get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-        )
-    )
+    llm = build_llm("gpt-4o-mini")
 
     # Generate descriptions
     print("Generating entity descriptions...")
     descriptions_dict = describe_entities(text, persons, companies, llm)
 
     # Save descriptions in simple dict format: {"entity": "description"}
-    with open(output_folder / "entity_descriptions.json", "w", encoding="utf-8") as f:
-        json.dump(descriptions_dict, f, indent=2)
+    write_json(output_folder / "entity_descriptions.json", descriptions_dict)
 
     print(f"Saved: {output_folder}/entity_descriptions.json")
     print(f"\nGenerated descriptions for {len(descriptions_dict)} entities")
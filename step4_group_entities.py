@@ -6,14 +6,13 @@ Reads: entity_descriptions.json (from step 3)
 Output: Creates dict_unique_grouped_entity_summary.json with grouped entities
 """
 
-import json
 import sys
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.azure_openai import AzureOpenAI
+from json_utils import read_json, write_json
+from cache_utils import run_cached_program
+from llm_utils import build_llm
 
 
 # Pydantic models
@@ -26,6 +25,14 @@ class EntityGrouping(BaseModel):
     groups: List[EntityGroup] = Field(description="Groups of entities that refer to the same person")
 
 
+GROUPING_PROMPT = """Entities:
+{entities_str}
+
+Group entities that clearly refer to the same person, allowing for name variations ("John Smith", "Mr. Smith", "J. Smith") and titles ("Dr. Jane Doe", "Jane Doe").
+Use the most complete/formal name of each group as its canonical name. When in doubt, keep entities separate.
+"""
+
+
 def group_entities(entities, llm):
     """Group similar entities together using LlamaIndex"""
 
@@ -38,27 +45,12 @@ def group_entities(entities, llm):
 
     entities_formatted = "\n".join(entity_list)
 
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=EntityGrouping,
-        llm=llm,
-        prompt_template_str="""You are an expert at entity resolution and deduplication.
-
-Analyze these entities and identify which ones refer to the same person.
-
-ENTITIES:
-{entities_str}
-
-Group together entities that clearly refer to the same person. Consider:
-- Name variations (e.g., "John Smith", "Mr. Smith", "J. Smith")
-- Titles and prefixes (e.g., "Dr. Jane Doe", "Jane Doe")
-
-For each group, choose the most complete/formal name as the canonical name.
-Only group entities if you're confident they're the same person. When in doubt, keep them separate.
-""",
-        verbose=False
+    result = run_cached_program(
+        EntityGrouping,
+        GROUPING_PROMPT,
+        llm,
+        entities_str=entities_formatted
     )
-
-    result = program(entities_str=entities_formatted)
     return result.groups
 
 
@@ -76,8 +68,7 @@ def main():
     # Read entity descriptions
     print("Reading entity_descriptions.json...")
     try:
-        with open(output_folder / "entity_descriptions.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_json(output_folder / "entity_descriptions.json")
     except FileNotFoundError:
         print("Error: entity_descriptions.json not found. Run step3_describe_entities.py first.")
         sys.exit(1)
@@ -90,9 +81,12 @@ def main():
         # New dict format
         entities_dict = data
 
+    # Nothing to group - write the empty result without calling the LLM
     if not entities_dict:
-        print("No entities found in entity_descriptions.json")
-        sys.exit(1)
+        print("No entities found in entity_descriptions.json - skipping grouping")
+        write_json(output_folder / "dict_unique_grouped_entity_summary.json", {})
+        print("\n=== STEP 4 COMPLETE ===\n")
+        return
 
     print(f"Original entity count: {len(entities_dict)}")
 
@@ -102,13 +96,7 @@ def main():
         entities.append({"entity": entity_name, "description": description})
 
     # Initialize Azure OpenAI LLM
-    llm = AzureOpenAI(
-        engine="gpt-4o-mini",
-        use_azure_ad=True,
-        azure_ad_token_provider=get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-        )
-    )
+    llm = build_llm("gpt-4o-mini")
 
     # Group entities
     print("Grouping entities...")
@@ -137,8 +125,7 @@ def main():
                 del grouped_entities[variation]
 
     # Save output as simple dict: {"entity1": "description1", ...}
-    with open(output_folder / "dict_unique_grouped_entity_summary.json", "w", encoding="utf-8") as f:
-        json.dump(grouped_entities, f, indent=2)
+    write_json(output_folder / "dict_unique_grouped_entity_summary.json", grouped_entities)
 
     print(f"Saved: {output_folder}/dict_unique_grouped_entity_summary.json")
     print(f"Original count: {len(entities_dict)}")
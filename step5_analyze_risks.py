@@ -6,14 +6,21 @@ Reads: dict_unique_grouped_entity_summary.json (from step 4) OR entity_descripti
 Output: Creates risk_assessment.json with flagged entities
 """
 
-import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.azure_openai import AzureOpenAI
+from json_utils import read_json, write_json
+from cache_utils import run_cached_program
+from llm_utils import build_llm
+
+
+# MODEL_TIER=full runs every entity on gpt-4o; on the default mini tier only
+# low-confidence assessments are re-run on gpt-4o
+MODEL_TIER = os.environ.get("MODEL_TIER", "mini")
+ESCALATION_CONFIDENCE = 0.6
 
 
 # Predefined list of financial crimes (FCP & AML)
@@ -35,23 +42,32 @@ FINANCIAL_CRIMES = [
     "human_trafficking"
 ]
 
-# Crime descriptions for the prompt
+# Concurrent LLM calls (entity batches are analyzed independently)
+MAX_WORKERS = 8
+
+# Entities assessed per LLM call; the crime list is sent once per batch
+ENTITY_BATCH_SIZE = 10
+
+# Output cap per call: a full batch of terse assessments plus JSON wrapping
+MAX_OUTPUT_TOKENS = 2000
+
+# Crime descriptions for the prompt, keyed by the names the model must return
 CRIME_DESCRIPTIONS = """
-1. Money Laundering - Concealing the origins of illegally obtained money
-2. Sanctions Evasion - Circumventing international sanctions
-3. Terrorist Financing - Providing financial support to terrorist organizations
-4. Bribery - Offering or receiving something of value to influence actions
-5. Corruption - Abuse of power for private gain
-6. Embezzlement - Theft or misappropriation of funds by a person in a position of trust
-7. Fraud - Intentional deception for financial gain
-8. Tax Evasion - Illegal non-payment or underpayment of taxes
-9. Insider Trading - Trading based on non-public material information
-10. Market Manipulation - Artificially inflating or deflating security prices
-11. Ponzi Scheme - Fraudulent investment operation paying returns from new investors
-12. Pyramid Scheme - Unsustainable business model recruiting members via promised payments
-13. Identity Theft - Unauthorized use of another person's identity for fraud
-14. Cybercrime - Criminal activities carried out using computers or the internet
-15. Human Trafficking - Illegal trade of people for exploitation or commercial gain
+money_laundering: concealing the origin of illegal money
+sanctions_evasion: circumventing international sanctions
+terrorist_financing: funding terrorist organizations
+bribery: giving/receiving value to influence actions
+corruption: abuse of power for private gain
+embezzlement: misappropriating entrusted funds
+fraud: deception for financial gain
+tax_evasion: illegal non-payment or underpayment of tax
+insider_trading: trading on material non-public information
+market_manipulation: artificially moving security prices
+ponzi_scheme: paying returns from new investors' money
+pyramid_scheme: recruitment-funded payouts
+identity_theft: using another person's identity for fraud
+cybercrime: crime committed via computers or the internet
+human_trafficking: trading people for exploitation
 """
 
 
@@ -62,32 +78,69 @@ class EntityRisk(BaseModel):
     crimes_flagged: List[str] = Field(description="List of crimes this entity is involved in")
     risk_level: str = Field(description="Risk level: high, medium, low, or none")
     confidence: float = Field(description="Confidence score between 0 and 1")
-    evidence: List[str] = Field(description="Evidence supporting the flagged crimes")
-    reasoning: str = Field(description="Reasoning for the assessment")
+    evidence: List[str] = Field(description="At most 3 short evidence points supporting the flagged crimes")
+    reasoning: str = Field(description="One-sentence reasoning, 30 words or fewer")
+
+
+class EntityRiskBatch(BaseModel):
+    assessments: List[EntityRisk] = Field(description="One assessment per entity, in the order given")
+
+
+# Prompt for one entity. Static instructions lead so every call shares one
+# cacheable prefix; the entity comes last.
+ENTITY_RISK_PROMPT = f"""Crimes:
+{CRIME_DESCRIPTIONS}
+Flag only crimes from the list above with credible evidence in the entity's description, using their exact names. Keep evidence and reasoning terse.
+
+Entity: {{entity_name}}
+Description: {{entity_description}}
+"""
 
 
 def analyze_entity(entity_name, entity_description, llm):
     """Analyze a single entity for financial crimes"""
 
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=EntityRisk,
-        llm=llm,
-        prompt_template_str=f"""You are an expert in financial crime detection. Analyze if this entity is involved in any of these crimes:
+    result = run_cached_program(
+        EntityRisk,
+        ENTITY_RISK_PROMPT,
+        llm,
+        entity_name=entity_name, entity_description=entity_description
+    )
+    return result
 
+
+# Prompt for a batch of entities, static instructions first as above
+BATCH_RISK_PROMPT = f"""Crimes:
 {CRIME_DESCRIPTIONS}
+For each entity below, flag only crimes from the list above with credible evidence in its own description, using their exact names.
+Return exactly one assessment per entity, using the entity name as given. Keep evidence and reasoning terse.
 
-Only flag crimes with credible evidence from the description.
+{{entities_str}}
+"""
 
-Entity: {{entity_name}}
-Description: {{entity_description}}
 
-Determine if there is evidence of any financial crimes. Only use crimes from this list: {', '.join(FINANCIAL_CRIMES)}
-""",
-        verbose=False
+def analyze_entities(batch, llm):
+    """Analyze a batch of (entity_name, entity_description) pairs in one call
+
+    Entities the model leaves out of its answer are retried one by one.
+    """
+    entities_str = "\n\n".join(
+        f"Entity: {entity_name}\nDescription: {entity_description}"
+        for entity_name, entity_description in batch
     )
 
-    result = program(entity_name=entity_name, entity_description=entity_description)
-    return result
+    result = run_cached_program(
+        EntityRiskBatch,
+        BATCH_RISK_PROMPT,
+        llm,
+        entities_str=entities_str
+    )
+
+    assessments = {a.entity_name: a for a in result.assessments}
+    return [
+        assessments.get(entity_name) or analyze_entity(entity_name, entity_description, llm)
+        for entity_name, entity_description in batch
+    ]
 
 
 def main():
@@ -106,8 +159,7 @@ def main():
     entities_dict = None
     try:
         print("Reading dict_unique_grouped_entity_summary.json...")
-        with open(output_folder / "dict_unique_grouped_entity_summary.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_json(output_folder / "dict_unique_grouped_entity_summary.json")
         # Check if it's the new dict format {"entity1": "desc1", ...}
         if isinstance(data, dict) and "entities" not in data:
             entities_dict = data
@@ -119,8 +171,7 @@ def main():
     except FileNotFoundError:
         print("Reading entity_descriptions.json...")
         try:
-            with open(output_folder / "entity_descriptions.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = read_json(output_folder / "entity_descriptions.json")
             # Handle both formats: dict {"entity": "desc"} or list {"entities": [...]}
             if isinstance(data, dict) and "entities" in data:
                 # Old list format
@@ -133,27 +184,44 @@ def main():
             print("Error: entity_descriptions.json not found. Run step3_describe_entities.py first.")
             sys.exit(1)
 
+    # Nothing to assess - write the empty result without calling the LLM
     if not entities_dict:
-        print("No entities found in input file")
-        sys.exit(1)
+        print("No entities found in input file - skipping risk analysis")
+        write_json(output_folder / "risk_assessment.json", {"flagged_entities": []})
+        print("\n=== STEP 5 COMPLETE ===\n")
+        return
 
     print(f"Analyzing {len(entities_dict)} entities...")
 
     # Initialize Azure OpenAI LLM
-    llm = AzureOpenAI(
-        engine="gpt-4o-mini",
-        use_azure_ad=True,
-        azure_ad_token_provider=get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-        )
-    )
-
-    # Analyze each entity and build results progressively
+    llm = build_llm("gpt-4o" if MODEL_TIER == "full" else "gpt-4o-mini", max_tokens=MAX_OUTPUT_TOKENS)
+
+    # Analyze entities in batches, with the batches running concurrently
+    items = list(entities_dict.items())
+    batches = [items[i:i + ENTITY_BATCH_SIZE] for i in range(0, len(items), ENTITY_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = [
+            result
+            for batch_results in executor.map(lambda batch: analyze_entities(batch, llm), batches)
+            for result in batch_results
+        ]
+
+    # Escalate low-confidence assessments to the larger model
+    uncertain = [i for i, result in enumerate(results) if result.confidence < ESCALATION_CONFIDENCE]
+    if uncertain and MODEL_TIER != "full":
+        print(f"Re-running {len(uncertain)} low-confidence entities on gpt-4o...")
+        escalation_llm = build_llm("gpt-4o", max_tokens=MAX_OUTPUT_TOKENS)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            escalated = executor.map(
+                lambda i: analyze_entity(items[i][0], items[i][1], escalation_llm), uncertain
+            )
+            for i, result in zip(uncertain, escalated):
+                results[i] = result
+
+    # Build results in the original entity order
     flagged_entities = []
-    for i, (entity_name, entity_description) in enumerate(entities_dict.items(), 1):
-        print(f"  [{i}/{len(entities_dict)}] Analyzing {entity_name}...")
-
-        result = analyze_entity(entity_name, entity_description, llm)
+    for i, (entity_name, result) in enumerate(zip(entities_dict, results), 1):
+        print(f"  [{i}/{len(entities_dict)}] Analyzed {entity_name}")
 
         # Only add to flagged list if crimes were detected
         if result.crimes_flagged and result.risk_level != "none":
@@ -163,8 +231,7 @@ def main():
     # Save results
     risk_assessment = {"flagged_entities": flagged_entities}
 
-    with open(output_folder / "risk_assessment.json", "w", encoding="utf-8") as f:
-        json.dump(risk_assessment, f, indent=2)
+    write_json(output_folder / "risk_assessment.json", risk_assessment)
 
     print(f"\nSaved: {output_folder}/risk_assessment.json")
     print(f"Flagged Entities: {len(flagged_entities)}/{len(entities_dict)}")
@@ -6,20 +6,27 @@ Reads: dict_unique_grouped_entity_summary.json, risk_assessment.json (from previ
 Output: Creates graph_elements.json with nodes and edges for visualization
 """
 
-import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.azure_openai import AzureOpenAI
+from json_utils import read_json, write_json
+from cache_utils import run_cached_program
+from llm_utils import build_llm
+
+
+# Concurrent LLM calls (entity pairs are classified independently)
+MAX_WORKERS = 8
+
+# Output cap per pair: a relationship label and one sentence of reasoning
+MAX_OUTPUT_TOKENS = 200
 
 
 # Pydantic model for relationship extraction
 class RelationshipExtraction(BaseModel):
     relationship: str = Field(description="Type of relationship between entities (e.g., Owner, Partner, Employee, Customer, Investor, Shareholder, etc.)")
-    reasoning: str = Field(description="Reasoning for the relationship classification")
+    reasoning: str = Field(description="One-sentence reasoning, 30 words or fewer")
 
 
 def extract_entity_links(entities_dict):
@@ -49,31 +56,24 @@ def create_entity_pairs(entity_links):
     return list(pairs)
 
 
-def classify_relationship(entity1, description1, entity2, description2, llm):
-    """Classify the relationship between two entities using LLM"""
-
-    combined_description = f"{entity1}: {description1}\n{entity2}: {description2}"
-
-    program = LLMTextCompletionProgram.from_defaults(
-        output_cls=RelationshipExtraction,
-        llm=llm,
-        prompt_template_str="""You are a compliance assistant analyzing entity relationships.
+# Static instructions lead so every pair shares one cacheable prefix; the
+# descriptions name both entities
+RELATIONSHIP_PROMPT = """Name the specific relationship between the two entities described below (e.g. Owner, Shareholder, Director, Employee, Client, Supplier, Subsidiary, Parent Company) and give brief reasoning.
 
-Based on the descriptions below, identify what type of relationship exists between {entity1} and {entity2}.
+Entity descriptions:
+{descriptions}
+"""
 
-Be specific and descriptive about the relationship type. Examples include but are not limited to:
-Owner, Partner, Employee, Customer, Investor, Shareholder, Beneficiary, Representative,
-Supplier, Client, Director, Manager, Subsidiary, Parent Company, Affiliated Entity, etc.
 
-Entity Descriptions:
-{descriptions}
+def classify_relationship(entity1, description1, entity2, description2, llm):
+    """Classify the relationship between two entities using LLM"""
 
-Identify the most accurate relationship type and provide clear reasoning.
-""",
-        verbose=False
-    )
+    combined_description = f"{entity1}: {description1}\n{entity2}: {description2}"
 
-    result = program(
+    result = run_cached_program(
+        RelationshipExtraction,
+        RELATIONSHIP_PROMPT,
+        llm,
         entity1=entity1,
         entity2=entity2,
         descriptions=combined_description
@@ -97,14 +97,12 @@ def main():
     entities_dict = None
     try:
         print("Reading dict_unique_grouped_entity_summary.json...")
-        with open(output_folder / "dict_unique_grouped_entity_summary.json", "r", encoding="utf-8") as f:
-            entities_dict = json.load(f)
+        entities_dict = read_json(output_folder / "dict_unique_grouped_entity_summary.json")
         print("Using grouped entities")
     except FileNotFoundError:
         print("Reading entity_descriptions.json...")
         try:
-            with open(output_folder / "entity_descriptions.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = read_json(output_folder / "entity_descriptions.json")
             # Handle both formats
             if isinstance(data, dict) and "entities" not in data:
                 entities_dict = data
@@ -119,17 +117,16 @@ def main():
     flagged_entities = set()
     try:
         print("Reading risk_assessment.json...")
-        with open(output_folder / "risk_assessment.json", "r", encoding="utf-8") as f:
-            risk_data = json.load(f)
+        risk_data = read_json(output_folder / "risk_assessment.json")
         for entity in risk_data.get("flagged_entities", []):
             flagged_entities.add(entity["entity_name"])
         print(f"Found {len(flagged_entities)} flagged entities")
     except FileNotFoundError:
         print("Warning: risk_assessment.json not found. No entities will be flagged.")
 
+    # With no entities there are no pairs; the empty graph is still written
     if not entities_dict:
-        print("No entities found")
-        sys.exit(1)
+        print("No entities found - no relationships to classify")
 
     print(f"Processing {len(entities_dict)} entities...")
 
@@ -142,46 +139,48 @@ def main():
     print(f"Found {len(entity_pairs)} entity pairs")
 
     # Initialize Azure OpenAI LLM
-    llm = AzureOpenAI(
-        engine="gpt-4o-mini",
-        use_azure_ad=True,
-        azure_ad_token_provider=get_bearer_token_provider(
-            DefaultAzureCredential(), "https://cognitiveservices.azure.com/.default"
-        )
-    )
+    llm = build_llm("gpt-4o-mini", max_tokens=MAX_OUTPUT_TOKENS)
 
-    # Classify relationships for each pair
+    # Classify relationships for all pairs concurrently
     print("Classifying relationships...")
-    relationships = []
-
-    for i, (entity1, entity2) in enumerate(entity_pairs, 1):
-        print(f"  [{i}/{len(entity_pairs)}] Analyzing {entity1} <-> {entity2}")
 
+    def classify_pair(pair):
+        entity1, entity2 = pair
         try:
-            result = classify_relationship(
+            return classify_relationship(
                 entity1,
                 entities_dict[entity1],
                 entity2,
                 entities_dict[entity2],
                 llm
-            )
+            ), None
+        except Exception as e:
+            return None, e
 
-            relationship_data = {
-                "entities": [entity1, entity2],
-                "relationship": result.relationship,
-                "reasoning": result.reasoning,
-                "involves_flagged": entity1 in flagged_entities or entity2 in flagged_entities
-            }
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        outcomes = list(executor.map(classify_pair, entity_pairs))
 
-            relationships.append(relationship_data)
-            print(f"    -> {result.relationship}")
+    relationships = []
 
-        except Exception as e:
-            print(f"    -> Error: {e}")
+    for i, ((entity1, entity2), (result, error)) in enumerate(zip(entity_pairs, outcomes), 1):
+        print(f"  [{i}/{len(entity_pairs)}] Analyzed {entity1} <-> {entity2}")
+
+        if error is not None:
+            print(f"    -> Error: {error}")
+            continue
+
+        relationship_data = {
+            "entities": [entity1, entity2],
+            "relationship": result.relationship,
+            "reasoning": result.reasoning,
+            "involves_flagged": entity1 in flagged_entities or entity2 in flagged_entities
+        }
+
+        relationships.append(relationship_data)
+        print(f"    -> {result.relationship}")
 
     # Save all relationships
-    with open(output_folder / "entity_relationships.json", "w", encoding="utf-8") as f:
-        json.dump(relationships, f, indent=2)
+    write_json(output_folder / "entity_relationships.json", relationships)
     print(f"\nSaved: {output_folder}/entity_relationships.json ({len(relationships)} relationships)")
 
     # Create graph structure
@@ -226,8 +225,7 @@ def main():
         "edges": edges
     }
 
-    with open(output_folder / "graph_elements.json", "w", encoding="utf-8") as f:
-        json.dump(graph_elements, f, indent=2)
+    write_json(output_folder / "graph_elements.json", graph_elements)
 
     print(f"Saved: {output_folder}/graph_elements.json")
     print(f"  Nodes: {len(nodes)}")
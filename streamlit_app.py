@@ -13,7 +13,8 @@ This app processes documents through a 6-step pipeline:
 import streamlit as st
 import streamlit.components.v1 as components
 import subprocess
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import hashlib
 import re
@@ -22,7 +23,8 @@ import pandas as pd
 import os
 from st_link_analysis import st_link_analysis, NodeStyle, EdgeStyle
 from database_utils import save_to_database, create_dataframe_from_results
-from ui_utils import define_html, show_beautiful_progress
+from json_utils import read_json, write_json
+from ui_utils import define_html, inject_progress_css, show_beautiful_progress
 
 # Configuration - Support both Domino and local environments
 if "DOMINO_DATASETS_DIR" in os.environ and "DOMINO_PROJECT_NAME" in os.environ:
@@ -44,6 +46,12 @@ ASSET_FOLDER.mkdir(parents=True, exist_ok=True)
 SQLITE_DB_PATH = ASSET_FOLDER / "articledetective_feedback.db"
 DUCKDB_DB_PATH = ASSET_FOLDER / "articledetective_feedback.duckdb"
 
+# Concurrent step 1 runs for multi-file uploads (bounded by Azure OpenAI rate limits)
+STEP1_MAX_WORKERS = 8
+
+# How often the streamed summary of the last step 1 run is redrawn
+STREAM_POLL_SECONDS = 0.2
+
 
 def transform_string(input_string):
     """Transform string for use as filename or folder name."""
@@ -67,8 +75,7 @@ def save_session(session_name, output_folder, file_names):
         "results_ready": st.session_state.get("results_ready", False)
     }
 
-    with open(session_file, "w") as f:
-        json.dump(session_data, f, indent=2)
+    write_json(session_file, session_data)
 
     return session_file
 
@@ -81,8 +88,7 @@ def load_session(session_name):
     if not session_file.exists():
         return None
 
-    with open(session_file, "r") as f:
-        session_data = json.load(f)
+    session_data = read_json(session_file)
 
     return session_data
 
@@ -95,8 +101,7 @@ def get_available_sessions():
     sessions = []
     for session_file in sessions_folder.glob("*.json"):
         try:
-            with open(session_file, "r") as f:
-                data = json.load(f)
+            data = read_json(session_file)
             sessions.append({
                 "name": data.get("session_name", session_file.stem),
                 "timestamp": data.get("timestamp", "Unknown"),
@@ -110,6 +115,28 @@ def get_available_sessions():
     return sessions
 
 
+@st.cache_data(max_entries=64)
+def _load_output_cached(path, mtime_ns):
+    return read_json(path)
+
+
+def load_output(path):
+    """Read a step output file, cached across reruns until the file changes"""
+    return _load_output_cached(str(path), Path(path).stat().st_mtime_ns)
+
+
+def save_upload(uploaded_file, file_path):
+    """Write an uploaded file to file_path unless the same bytes are already there"""
+    data = uploaded_file.getbuffer()
+
+    # Streamlit reruns the script on every interaction; skip rewriting unchanged uploads
+    if file_path.exists() and file_path.stat().st_size == len(data) and file_path.read_bytes() == data:
+        return
+
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
 def run_step(script_name, args):
     """Run a step script with output visible in terminal"""
     try:
@@ -127,6 +154,30 @@ def run_step(script_name, args):
         return False, "", str(e)
 
 
+def start_step(script_name, args):
+    """Start a step script in the background with output visible in terminal"""
+    cmd = ["python", script_name] + args
+    return subprocess.Popen(cmd, text=True)
+
+
+def wait_for_step(process, stream_path, placeholder, until=None):
+    """Wait for a started step (or until() to hold), redrawing the streamed summary meanwhile
+
+    Returns (success, stdout, stderr) like run_step once the process has exited,
+    or None if until() became true first.
+    """
+    while process.poll() is None:
+        if until is not None and until():
+            return None
+        if stream_path.exists():
+            placeholder.markdown(stream_path.read_text(encoding="utf-8"))
+        time.sleep(STREAM_POLL_SECONDS)
+
+    if process.returncode != 0:
+        return False, "", str(subprocess.CalledProcessError(process.returncode, process.args))
+    return True, "", ""
+
+
 def main():
     st.set_page_config(
         page_title="Article Detective",
@@ -329,8 +380,7 @@ def main():
                 article_cleaned = transform_string(name_article)
                 file_path = output_folder / f"{article_cleaned}{file_ext}"
 
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
+                save_upload(uploaded_file, file_path)
                 file_paths.append(file_path)
 
             st.markdown("---")
@@ -344,7 +394,6 @@ def main():
         # Process documents button - only show if files were uploaded
         if uploaded_files and st.button("🚀 Process Documents", type="primary"):
             # Track processing time
-            import time
             start_time = time.time()
 
             # Create outputs subfolder
@@ -358,24 +407,78 @@ def main():
             errors = []
 
             # Process all files through step 1
-            total_steps = len(file_paths) + 5  # Files + 5 remaining steps
+            # Files (+ combined summary when several) + 5 remaining steps
+            total_steps = len(file_paths) + (1 if len(file_paths) > 1 else 0) + 5
             current_step = 0
 
-            # Beautiful progress display container
+            # Beautiful progress display container; its style is injected once
+            # here rather than on every progress update
+            inject_progress_css()
             progress_container = st.empty()
+            summary_placeholder = st.empty()
+
+            # Steps 2-6 never read the summaries, so the summary LLM call runs
+            # alongside them; they only wait for extracted_text.txt
+            extracted_text_path = outputs_folder / "extracted_text.txt"
+            stream_path = outputs_folder / "summary_stream.txt"
+            extracted_text_path.unlink(missing_ok=True)
+            summary_process = None
 
-            for file_path in file_paths:
+            if len(file_paths) == 1:
                 current_step += 1
-                progress = current_step / total_steps
-                elapsed = time.time() - start_time
+                show_beautiful_progress(progress_container, int(current_step / total_steps * 100), time.time() - start_time)
+
+                # Its summary streams into the page as it is generated
+                summary_process = start_step(
+                    "step1_summarize.py",
+                    [str(file_paths[0]), str(outputs_folder), "--stream-summary"]
+                )
+                outcome = wait_for_step(summary_process, stream_path, summary_placeholder, until=extracted_text_path.exists)
+                if outcome is not None:
+                    summary_process = None
+                    success, stdout, stderr = outcome
+                    if not success or not extracted_text_path.exists():
+                        all_success = False
+                        errors.append(f"Step 1 failed for {file_paths[0].name}: {stderr}")
+            else:
+                # Step 1 is independent per file, so every file runs
+                # concurrently. Only the last file writes extracted_text.txt,
+                # which is what steps 2-3 read, as with a sequential loop.
+                # The runs share the CPUs for PDF page extraction.
+                concurrent_runs = min(STEP1_MAX_WORKERS, len(file_paths))
+                pdf_workers = f"--pdf-workers={max(1, (os.cpu_count() or 1) // concurrent_runs)}"
+                with ThreadPoolExecutor(max_workers=concurrent_runs) as executor:
+                    futures = {
+                        executor.submit(
+                            run_step,
+                            "step1_summarize.py",
+                            [str(file_path), str(outputs_folder), "--skip-combined-summary", pdf_workers]
+                            + ([] if file_path == file_paths[-1] else ["--skip-extracted-text"])
+                        ): file_path
+                        for file_path in file_paths
+                    }
+                    show_beautiful_progress(progress_container, int(current_step / total_steps * 100), time.time() - start_time)
 
-                show_beautiful_progress(progress_container, int(progress * 100), elapsed)
+                    for future in as_completed(futures):
+                        current_step += 1
+                        progress = current_step / total_steps
+                        elapsed = time.time() - start_time
 
-                success, stdout, stderr = run_step("step1_summarize.py", [str(file_path), str(outputs_folder)])
-                if not success:
-                    all_success = False
-                    errors.append(f"Step 1 failed for {file_path.name}: {stderr}")
-                    break
+                        show_beautiful_progress(progress_container, int(progress * 100), elapsed)
+
+                        success, stdout, stderr = future.result()
+                        if not success:
+                            all_success = False
+                            errors.append(f"Step 1 failed for {futures[future].name}: {stderr}")
+
+                # The combined summary over every file needs all summaries;
+                # it streams into the page while steps 2-6 run
+                if all_success:
+                    current_step += 1
+                    summary_process = start_step(
+                        "step1_summarize.py",
+                        ["--combined-summary-only", str(outputs_folder), "--stream-summary"]
+                    )
 
             # Run remaining steps once (they process all entities together)
             if all_success:
@@ -394,12 +497,21 @@ def main():
 
                     show_beautiful_progress(progress_container, int(progress * 100), elapsed)
 
-                    success, stdout, stderr = run_step(script, [str(outputs_folder)])
+                    process = start_step(script, [str(outputs_folder)])
+                    success, stdout, stderr = wait_for_step(process, stream_path, summary_placeholder)
                     if not success:
                         all_success = False
                         errors.append(f"{script} failed: {stderr}")
                         break
 
+            # Let the summary finish (it usually has by now)
+            if summary_process is not None:
+                success, stdout, stderr = wait_for_step(summary_process, stream_path, summary_placeholder)
+                if not success:
+                    all_success = False
+                    errors.append(f"Summary failed: {stderr}")
+            summary_placeholder.empty()
+
             # Calculate final processing time
             end_time = time.time()
             processing_time = end_time - start_time
@@ -437,8 +549,7 @@ def main():
                     # Check for combined summary first
                     combined_summary_path = outputs_folder / "combined_summary.json"
                     if combined_summary_path.exists():
-                        with open(combined_summary_path, "r") as f:
-                            combined = json.load(f)
+                        combined = load_output(combined_summary_path)
 
                         if 'edit_mode_summary' not in st.session_state:
                             st.session_state.edit_mode_summary = False
@@ -466,14 +577,12 @@ def main():
                     if summary_files and len(summary_files) > 1:
                         st.markdown("**Individual Summaries:**")
                         for summary_file in summary_files:
-                            with open(summary_file, "r") as f:
-                                summary = json.load(f)
+                            summary = load_output(summary_file)
                             with st.expander(f"📄 {Path(summary['file_name']).name}"):
                                 st.write(summary["summary"])
                     elif summary_files and len(summary_files) == 1:
                         # Single file case
-                        with open(summary_files[0], "r") as f:
-                            summary = json.load(f)
+                        summary = load_output(summary_files[0])
 
                         if 'edit_mode_summary' not in st.session_state:
                             st.session_state.edit_mode_summary = False
@@ -505,11 +614,9 @@ def main():
                 st.header("📊 Activities Table")
 
                 try:
-                    with open(outputs_folder / "dict_unique_grouped_entity_summary.json", "r") as f:
-                        entities = json.load(f)
+                    entities = load_output(outputs_folder / "dict_unique_grouped_entity_summary.json")
 
-                    with open(outputs_folder / "risk_assessment.json", "r") as f:
-                        risks = json.load(f)
+                    risks = load_output(outputs_folder / "risk_assessment.json")
 
                     # Create a mapping of entities to their crime flags and reasoning
                     entity_crimes = {}
@@ -738,12 +845,10 @@ def main():
 
                 try:
                     # Load graph elements for visualization
-                    with open(outputs_folder / "graph_elements.json", "r") as f:
-                        elements = json.load(f)
+                    elements = load_output(outputs_folder / "graph_elements.json")
 
                     # Load all relationships to determine unique relationship types
-                    with open(outputs_folder / "entity_relationships.json", "r") as f:
-                        relationships = json.load(f)
+                    relationships = load_output(outputs_folder / "entity_relationships.json")
 
                     # Dynamically create edge styles for all unique relationship types found
                     unique_relationships = set(r["relationship"] for r in relationships)
@@ -807,8 +912,7 @@ def main():
                 st.header("👥 Entity Summaries")
 
                 try:
-                    with open(outputs_folder / "dict_unique_grouped_entity_summary.json", "r") as f:
-                        entities = json.load(f)
+                    entities = load_output(outputs_folder / "dict_unique_grouped_entity_summary.json")
 
                     # Entity selector
                     entity_list = list(entities.keys())
@@ -844,11 +948,9 @@ def main():
 
                 # Load entities for commenting
                 try:
-                    with open(outputs_folder / "dict_unique_grouped_entity_summary.json", "r") as f:
-                        entities = json.load(f)
+                    entities = load_output(outputs_folder / "dict_unique_grouped_entity_summary.json")
 
-                    with open(outputs_folder / "risk_assessment.json", "r") as f:
-                        risk_assessment = json.load(f)
+                    risk_assessment = load_output(outputs_folder / "risk_assessment.json")
 
                     # Allow adding comments to entities
                     with st.expander("Add Comments to Entities (Optional)"):
@@ -8,11 +8,11 @@ from pathlib import Path
 import os
 import hashlib
 import subprocess
-import json
 import glob
 import pandas as pd
 import re
 from datetime import datetime
+from json_utils import read_json
 
 # Import optional components (graceful degradation if not available)
 try:
@@ -251,8 +251,7 @@ def main():
             # Article Summary Section
             st.subheader("📄 Article Summary")
             try:
-                with open(outputs_folder / "summary.json", "r") as f:
-                    summary_data = json.load(f)
+                summary_data = read_json(outputs_folder / "summary.json")
                 st.write(summary_data["summary"])
             except Exception as e:
                 st.error(f"Could not load summary: {e}")
@@ -262,8 +261,7 @@ def main():
             st.subheader("👥 Entities")
 
             try:
-                with open(outputs_folder / "dict_unique_grouped_entity_summary.json", "r") as f:
-                    dict_entity_summaries = json.load(f)
+                dict_entity_summaries = read_json(outputs_folder / "dict_unique_grouped_entity_summary.json")
 
                 entities = list(dict_entity_summaries.keys())
 
@@ -290,8 +288,7 @@ def main():
             st.subheader("⚠️ Risk Assessment")
 
             try:
-                with open(outputs_folder / "risk_assessment.json", "r") as f:
-                    risks = json.load(f)
+                risks = read_json(outputs_folder / "risk_assessment.json")
 
                 flagged = risks.get("flagged_entities", [])
                 if flagged:
@@ -315,8 +312,7 @@ def main():
 
             try:
                 # Load relationships
-                with open(outputs_folder / "entity_relationships_filtered.json", "r") as f:
-                    relationships = json.load(f)
+                relationships = read_json(outputs_folder / "entity_relationships_filtered.json")
 
                 st.write(f"**Total relationships:** {len(relationships)}")
 
@@ -336,8 +332,7 @@ def main():
                 if HAS_LINK_ANALYSIS:
                     st.markdown("**Interactive Knowledge Graph:**")
                     try:
-                        with open(outputs_folder / "graph_elements.json", "r") as f:
-                            elements = json.load(f)
+                        elements = read_json(outputs_folder / "graph_elements.json")
 
                         edge_styles = [
                             EdgeStyle("Owner", caption='label', directed=False),
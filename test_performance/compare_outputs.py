@@ -1,4 +1,4 @@
-from typing import Dict, List, Set
+from typing import Dict, FrozenSet, List, Set
 
 
 def normalize_entity_key(entity: Dict) -> str:
@@ -16,31 +16,47 @@ def calculate_entity_similarity(ref_keys: Set[str], cur_keys: Set[str]) -> float
     return intersection / union if union > 0 else 0.0
 
 
+def get_crime_sets(entities: Dict, keys: Set[str]) -> Dict[str, FrozenSet[str]]:
+    return {key: frozenset(entities[key].get('crimes_flagged', ())) for key in keys}
+
+
+def get_crime_masks(entities: Dict, keys: Set[str], crime_bits: Dict[str, int]) -> Dict[str, int]:
+    # One bit per crime label; crime_bits is shared so both sides use the same bits
+    masks = {}
+    for key in keys:
+        mask = 0
+        for crime in entities[key].get('crimes_flagged', ()):
+            mask |= 1 << crime_bits.setdefault(crime, len(crime_bits))
+        masks[key] = mask
+    return masks
+
+
+def crime_jaccard(ref_mask: int, cur_mask: int) -> float:
+    intersection = (ref_mask & cur_mask).bit_count()
+    union = (ref_mask | cur_mask).bit_count()
+    return intersection / union if union > 0 else 0.0
+
+
 def calculate_crime_similarity(ref_entities: Dict, cur_entities: Dict) -> float:
-    matched_keys = set(ref_entities.keys()) & set(cur_entities.keys())
+    matched_keys = ref_entities.keys() & cur_entities.keys()
 
     if not matched_keys:
         return 0.0
 
-    crime_scores = []
-    for key in matched_keys:
-        ref_crimes = set(ref_entities[key].get('crimes_flagged', []))
-        cur_crimes = set(cur_entities[key].get('crimes_flagged', []))
-
-        intersection = len(ref_crimes & cur_crimes)
-        union = len(ref_crimes | cur_crimes)
-        score = intersection / union if union > 0 else 0.0
-        crime_scores.append(score)
-
-    return sum(crime_scores) / len(crime_scores) if crime_scores else 0.0
+    crime_bits = {}
+    ref_masks = get_crime_masks(ref_entities, matched_keys, crime_bits)
+    cur_masks = get_crime_masks(cur_entities, matched_keys, crime_bits)
+    return sum(crime_jaccard(ref_masks[key], cur_masks[key]) for key in matched_keys) / len(matched_keys)
 
 
 def get_crime_details(ref_entities: Dict, cur_entities: Dict, matched_keys: Set[str]) -> List[Dict]:
     details = []
+    ref_crime_sets = get_crime_sets(ref_entities, matched_keys)
+    cur_crime_sets = get_crime_sets(cur_entities, matched_keys)
 
     for key in matched_keys:
-        ref_crimes = set(ref_entities[key].get('crimes_flagged', []))
-        cur_crimes = set(cur_entities[key].get('crimes_flagged', []))
+        ref_crimes = ref_crime_sets[key]
+        cur_crimes = cur_crime_sets[key]
 
         if ref_crimes != cur_crimes:
             details.append({
@@ -65,19 +81,19 @@ def compare_outputs(reference: Dict, current: Dict) -> Dict:
         for e in current.get('flagged_entities', [])
     }
 
+    ref_keys = set(ref_entities)
+    cur_keys = set(cur_entities)
+
     # Metric 1: Entity Detection
-    entity_similarity = calculate_entity_similarity(
-        set(ref_entities.keys()),
-        set(cur_entities.keys())
-    )
+    entity_similarity = calculate_entity_similarity(ref_keys, cur_keys)
 
     # Metric 2: Crime Matching (for matched entities only)
     crime_similarity = calculate_crime_similarity(ref_entities, cur_entities)
 
     # Detailed breakdown
-    matched = set(ref_entities.keys()) & set(cur_entities.keys())
-    missing = set(ref_entities.keys()) - set(cur_entities.keys())
-    extra = set(cur_entities.keys()) - set(ref_entities.keys())
+    matched = ref_keys & cur_keys
+    missing = ref_keys - cur_keys
+    extra = cur_keys - ref_keys
 
     return {
         'entity_similarity': entity_similarity,
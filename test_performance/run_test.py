@@ -1,12 +1,14 @@
 import sys
 import json
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 # Add parent directory to path to import steps
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from json_utils import read_json
 from test_performance.compare_outputs import compare_outputs
 import test_performance.config as config
 
@@ -30,11 +32,10 @@ def run_steps_for_article(article_folder: Path) -> dict:
         print(f" ERROR: risk_assessment.json not found at {risk_file}")
         return None
 
-    with open(risk_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_json(risk_file)
 
 
-def run_performance_test(verbose: bool = True):
+def run_performance_test(verbose: bool = True, workers: int = 4):
     timestamp = datetime.now().isoformat()
     all_results = []
 
@@ -43,11 +44,9 @@ def run_performance_test(verbose: bool = True):
         print(f"Starting Performance Test: {timestamp}")
         print(f"{'='*60}\n")
 
+    # Find each article's output folder in test_articles
+    article_folders = {}
     for article_name in config.TEST_ARTICLES:
-        if verbose:
-            print(f"Processing {article_name}...")
-
-        # Find the article's output folder in test_articles
         article_folder = config.TEST_ARTICLES_DIR / article_name / "outputs"
 
         if not article_folder.exists():
@@ -55,8 +54,19 @@ def run_performance_test(verbose: bool = True):
             print(f" Skipping {article_name}")
             continue
 
-        # Run steps to generate current output
-        current_output = run_steps_for_article(article_folder)
+        article_folders[article_name] = article_folder
+
+    # Run steps to generate current outputs; each article is an independent
+    # subprocess waiting on the LLM, so they run concurrently
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        current_outputs = dict(zip(
+            article_folders,
+            executor.map(run_steps_for_article, article_folders.values())
+        ))
+
+    for article_name, current_output in current_outputs.items():
+        if verbose:
+            print(f"Processing {article_name}...")
 
         if current_output is None:
             print(f" Failed to generate output for {article_name}")
@@ -69,8 +79,7 @@ def run_performance_test(verbose: bool = True):
             print(f" Skipping {article_name}")
             continue
 
-        with open(reference_path, 'r', encoding='utf-8') as f:
-            reference_output = json.load(f)
+        reference_output = read_json(reference_path)
 
         # Save current output with timestamp for debugging
         output_filename = f"{article_name}_{timestamp.replace(':', '-')}.json"
@@ -165,9 +174,10 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Run performance test for 05_analyze_risks.py")
     parser.add_argument("--quiet", "-q", action="store_true", help="Suppress detailed output")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Articles processed concurrently")
     args = parser.parse_args()
 
-    result = run_performance_test(verbose=not args.quiet)
+    result = run_performance_test(verbose=not args.quiet, workers=args.workers)
 
     if result is None:
         sys.exit(1)
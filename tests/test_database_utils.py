@@ -0,0 +1,57 @@
+"""
+Tests for database_utils.save_to_database
+"""
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("duckdb")
+pd = pytest.importorskip("pandas")
+
+from database_utils import save_to_database  # noqa: E402
+
+TABLE = "entities"
+
+
+def _frame(entity, comments=""):
+    return pd.DataFrame({
+        "entity": [entity],
+        "summary": ["Director of Acme Ltd."],
+        "comments": [comments],
+        "flagged": [True],
+        "fraud": [True],
+    })
+
+
+def _count(sqlite_path, entity):
+    with sqlite3.connect(sqlite_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE entity = ?", (entity,)).fetchone()[0]
+
+
+def test_repeat_save_of_entity_with_apostrophe_adds_no_row(tmp_path):
+    sqlite_path, duckdb_path = tmp_path / "db.sqlite", tmp_path / "db.duckdb"
+
+    ok, _ = save_to_database(_frame("Patrick O'Brien"), TABLE, "s1", sqlite_path, duckdb_path)
+    assert ok
+    ok, message = save_to_database(_frame("Patrick O'Brien"), TABLE, "s2", sqlite_path, duckdb_path)
+
+    assert ok
+    assert message == "No new changes to save"
+    assert _count(sqlite_path, "Patrick O'Brien") == 1
+
+
+def test_legacy_escaped_rows_are_migrated(tmp_path):
+    sqlite_path, duckdb_path = tmp_path / "db.sqlite", tmp_path / "db.duckdb"
+
+    # Rows saved by older versions stored every ' as ''
+    save_to_database(_frame("Patrick O''Brien", "it''s fine"), TABLE, "s0", sqlite_path, duckdb_path)
+    with sqlite3.connect(sqlite_path) as conn:
+        conn.execute("DELETE FROM schema_migrations")
+
+    ok, message = save_to_database(_frame("Patrick O'Brien", "it's fine"), TABLE, "s1", sqlite_path, duckdb_path)
+
+    assert ok
+    assert message == "No new changes to save"
+    assert _count(sqlite_path, "Patrick O'Brien") == 1
+    assert _count(sqlite_path, "Patrick O''Brien") == 0
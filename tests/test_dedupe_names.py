@@ -0,0 +1,25 @@
+"""
+Tests for step3_describe_entities.dedupe_names
+"""
+
+import pytest
+
+pytest.importorskip("rapidfuzz")
+pytest.importorskip("pydantic")
+pytest.importorskip("llama_index.core")
+pytest.importorskip("llama_index.llms.azure_openai")
+pytest.importorskip("azure.identity")
+
+from step3_describe_entities import dedupe_names  # noqa: E402
+
+
+def test_title_variant_is_merged():
+    assert dedupe_names(["Mr. John Smith", "John Smith"]) == ["Mr. John Smith"]
+
+
+def test_similar_first_names_are_kept():
+    assert dedupe_names(["Joan Smith", "John Smith"]) == ["Joan Smith", "John Smith"]
+
+
+def test_legal_form_variant_is_merged():
+    assert dedupe_names(["Acme Ltd.", "ACME"]) == ["Acme Ltd."]
@@ -0,0 +1,55 @@
+"""
+Token Utility Functions for the Pipeline Steps
+Token-accurate truncation of document text before it is sent to the LLM
+
+tiktoken is optional: without it, text is cut at CHARS_PER_TOKEN characters
+per token, the heuristic the steps used before.
+"""
+from functools import lru_cache
+
+# tiktoken is optional - falls back to a character estimate without it
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+CHARS_PER_TOKEN = 4
+
+# Upper bound on characters per token when choosing how much text to encode
+MAX_CHARS_PER_TOKEN = 16
+
+# Upper bound on tokens per character: a BPE token covers at least one byte,
+# and a character is at most 4 UTF-8 bytes (CJK and emoji can take several)
+MAX_TOKENS_PER_CHAR = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model):
+    """tiktoken encoding for model (o200k_base for models tiktoken doesn't know)"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def truncate_to_tokens(text, max_tokens, model):
+    """Return the longest prefix of text that fits in max_tokens tokens of model"""
+    if not TIKTOKEN_AVAILABLE:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    # No text this short can exceed the budget; skip encoding it
+    if len(text) * MAX_TOKENS_PER_CHAR <= max_tokens:
+        return text
+
+    # Encode only a prefix long enough to hold max_tokens tokens of any
+    # realistic text, not a whole multi-megabyte document
+    encoding = get_encoding(model)
+    prefix = text[:max_tokens * MAX_CHARS_PER_TOKEN]
+    tokens = encoding.encode(prefix, disallowed_special=())
+    if len(tokens) <= max_tokens and len(prefix) < len(text):
+        # Unusually long tokens - fall back to encoding everything
+        tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -144,8 +144,22 @@ def define_html(filtered_df, cols_to_exclude, col_boolean_list):
     return html_string
 
 
+PROGRESS_CSS = """
+<style>
+.stProgress > div > div > div > div {
+    background-color: #28a745;
+}
+</style>
+"""
+
+
+def inject_progress_css():
+    """Inject the green progress bar style once per script run"""
+    st.markdown(PROGRESS_CSS, unsafe_allow_html=True)
+
+
 def show_beautiful_progress(progress_container, percentage, elapsed_time):
-    """Display a compact progress UI with green styling"""
+    """Display a compact progress UI (green once inject_progress_css() has run)"""
     minutes = int(elapsed_time // 60)
     seconds = int(elapsed_time % 60)
 
@@ -159,12 +173,4 @@ def show_beautiful_progress(progress_container, percentage, elapsed_time):
         with col3:
             st.markdown(f"<p style='text-align: right; margin: 0; font-size: 14px;'>⏱️ {minutes:02d}:{seconds:02d}</p>", unsafe_allow_html=True)
 
-        # Green progress bar
-        st.markdown("""
-        <style>
-        .stProgress > div > div > div > div {
-            background-color: #28a745;
-        }
-        </style>
-        """, unsafe_allow_html=True)
         st.progress(percentage / 100.0)